@@ -0,0 +1,115 @@
+"""
+Throughput of the in-process classifier vs the process-pool backend
+Replays decoded dataset frames from the same number of client threads (two
+per core) against both paths, with the benchmark and its worker processes
+pinned to 1, 2, 4 and 8 cores, and prints frames/second for each (Linux)
+
+    python benchmarks/bench_process_backend.py --frames 200
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'web_app'))
+from inference_classifier import SignLanguageClassifier
+from process_backend import ProcessInferenceBackend
+
+DATA_DIR = os.path.join(BASE_DIR, 'dataset', 'Lettres_sign_ar', 'Lettres_sign_ar')
+
+
+def load_frames(data_dir, limit):
+    """Decode up to `limit` dataset images to RGB, spread across classes"""
+    paths = []
+    for class_dir in sorted(os.listdir(data_dir)):
+        class_path = os.path.join(data_dir, class_dir)
+        if os.path.isdir(class_path):
+            paths.extend(os.path.join(class_path, name) for name in sorted(os.listdir(class_path))[:10])
+
+    frames = []
+    for path in paths[:limit]:
+        img = cv2.imread(path)
+        if img is not None:
+            frames.append(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+    return frames
+
+
+def run_clients(predict, frames, num_clients):
+    """Split the frames across client threads, return frames/second"""
+    def client(offset):
+        for frame in frames[offset::num_clients]:
+            predict(frame)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(num_clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(frames) / (time.perf_counter() - start)
+
+
+def pin_to_cores(cores, available):
+    """Restrict this process (and the processes it starts from now on) to `cores` CPUs"""
+    os.sched_setaffinity(0, sorted(available)[:cores])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--cores', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    frames = load_frames(args.data_dir, args.frames)
+    if not frames:
+        print(f"❌ No images found in {args.data_dir}")
+        return
+    if not hasattr(os, 'sched_setaffinity'):
+        print("❌ Pinning to cores needs os.sched_setaffinity (Linux)")
+        return
+    max_frame_bytes = max(frame.nbytes for frame in frames)
+    available = os.sched_getaffinity(0)
+    print(f"🚀 {len(frames)} frames, {len(available)} CPUs available")
+
+    results = []
+    for cores in args.cores:
+        if cores > len(available):
+            print(f"   ⚠️ Skipping {cores} cores, only {len(available)} available")
+            continue
+        pin_to_cores(cores, available)
+        # Two clients per core on both sides, enough to keep every worker busy
+        # while the next frame is copied in
+        clients = 2 * cores
+
+        # In-process: a detector pool with one detector per core
+        classifier = SignLanguageClassifier(batch_max_size=1, detector_pool_size=cores)
+        run_clients(classifier.predict_frame_detailed, frames[:clients], clients)  # warm-up
+        inprocess_fps = run_clients(classifier.predict_frame_detailed, frames, clients)
+
+        # Started after pinning, the worker processes inherit the same cores
+        backend = ProcessInferenceBackend(cores, max_frame_bytes)
+        backend.start()
+        run_clients(backend.predict, frames[:clients], clients)  # warm-up
+        process_fps = run_clients(backend.predict, frames, clients)
+        backend.close()
+
+        results.append({'cores': cores, 'clients': clients, 'inprocess_fps': inprocess_fps, 'process_fps': process_fps})
+        print(f"   {cores} cores: in-process {inprocess_fps:7.1f} fps | process pool {process_fps:7.1f} fps "
+              f"({process_fps / inprocess_fps:.2f}x)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'frames': len(frames), 'results': results}, f, indent=2)
+        print(f"💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
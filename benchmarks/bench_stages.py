@@ -0,0 +1,135 @@
+"""
+Per-stage latency of the /predict path, replayed over the fixture corpus
+Each stage is timed on its own with the output of the previous one:
+
+    base64_decode   data URL -> JPEG bytes (JSON uploads)
+    imdecode        JPEG bytes -> RGB frame (decode_frame, MAX_FRAME_DIM)
+    detect          MediaPipe HandLandmarker
+    features        build_features on one hand
+    predict         model.predict_proba on one row (no batching, no cache)
+    serialize       JSON body of a /predict response
+    serialize_<fmt> the same response in each compact format (flat, packed, msgpack)
+
+    python benchmarks/fixtures.py                  # once
+    python benchmarks/bench_stages.py --output results.json
+    python benchmarks/bench_stages.py --compare results.json
+"""
+import argparse
+import base64
+import os
+import sys
+import time
+
+import numpy as np
+
+from bench_utils import BASE_DIR, compare, print_table, save_results, summarize
+from fixtures import CORPUS_FILE, load_corpus
+
+sys.path.insert(0, os.path.join(BASE_DIR, 'web_app'))
+from frame_decoding import decode_frame
+from landmark_features import build_features
+from response_encoding import FORMATS, encode_response
+
+MAX_FRAME_DIM = int(os.environ.get('MAX_FRAME_DIM', '640'))
+
+
+def decode_data_url(data):
+    # Same as app.decode_data_url (importing app would start the whole server)
+    encoded = data.split(",", 1)[1] if "," in data else data
+    return base64.b64decode(encoded)
+
+
+def time_calls(fn, inputs, repeat):
+    """Per-call timings of fn over inputs, `repeat` passes; returns (timings, outputs of the last pass)"""
+    timings = []
+    outputs = []
+    for _ in range(repeat):
+        outputs = []
+        for item in inputs:
+            start = time.perf_counter()
+            out = fn(item)
+            timings.append(time.perf_counter() - start)
+            outputs.append(out)
+    return timings, outputs
+
+
+def run_stages(corpus, classifier, repeat):
+    stages = {}
+    frames_bytes = [corpus.frame_bytes(i) for i in range(len(corpus))]
+    data_urls = ['data:image/jpeg;base64,' + base64.b64encode(b).decode() for b in frames_bytes]
+
+    timings, _ = time_calls(decode_data_url, data_urls, repeat)
+    stages['base64_decode'] = summarize(timings)
+
+    timings, frames = time_calls(lambda b: decode_frame(b, MAX_FRAME_DIM), frames_bytes, repeat)
+    stages['imdecode'] = summarize(timings)
+
+    if classifier is not None:
+        timings, _ = time_calls(classifier.detect, [f for f in frames if f is not None], repeat)
+        stages['detect'] = summarize(timings)
+    else:
+        stages['detect'] = {'count': 0}
+
+    hands = list(corpus.hands())
+    timings, features = time_calls(build_features, hands, repeat)
+    stages['features'] = summarize(timings)
+
+    if classifier is not None:
+        rows = [f.reshape(1, -1) for f in features]
+        timings, _ = time_calls(classifier.model.predict_proba, rows, repeat)
+        stages['predict'] = summarize(timings)
+    else:
+        stages['predict'] = {'count': 0}
+
+    labels = list(corpus.labels[~np.isnan(corpus.landmarks).any(axis=(1, 2))])
+    responses = [{'prediction': label, 'confidence': 0.9, 'landmarks': hand[np.newaxis]}
+                 for label, hand in zip(labels, hands)]
+    for name, media_type in FORMATS.items():
+        timings, bodies = time_calls(lambda r: encode_response(r, media_type), responses, repeat)
+        stage = 'serialize' if name == 'json' else f'serialize_{name}'
+        stages[stage] = summarize(timings)
+        if bodies:
+            size = np.mean([len(b.encode() if isinstance(b, str) else b) for b in bodies])
+            print(f"   {stage}: {size:.0f} bytes per response")
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', default=CORPUS_FILE)
+    parser.add_argument('--repeat', type=int, default=3, help='Passes over the corpus per stage')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--compare', help='Previous results file to compare against')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.corpus):
+        print(f"❌ No corpus at {args.corpus}, build it with benchmarks/fixtures.py")
+        return 1
+    corpus = load_corpus(args.corpus)
+
+    try:
+        from inference_classifier import SignLanguageClassifier
+        classifier = SignLanguageClassifier(batch_max_size=1, detector_pool_size=1)
+    except Exception as e:
+        print(f"⚠️ Classifier not available ({e}), detect and predict are skipped")
+        classifier = None
+
+    print(f"🚀 {len(corpus)} frames, {len(corpus.hands())} hands, {args.repeat} passes")
+    stages = run_stages(corpus, classifier, args.repeat)
+    print_table(stages)
+
+    # Sequential sum of the stage medians: the floor of one /predict call
+    path = ('imdecode', 'detect', 'features', 'predict', 'serialize')
+    if all(stages[name].get('count') for name in path):
+        print(f"   {'/predict floor':<20}{'':7}{sum(stages[name]['p50_ms'] for name in path):10.3f}")
+
+    if args.output:
+        save_results(args.output, {'corpus': os.path.basename(args.corpus), 'frames': len(corpus),
+                                   'repeat': args.repeat, 'stages': stages})
+    if args.compare:
+        return 1 if compare(args.compare, stages) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Shared helpers of the benchmark scripts: latency summaries, machine-readable
+results and comparison against a previous results file
+"""
+import json
+import os
+import platform
+import subprocess
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def summarize(timings, wall_seconds=None):
+    """
+    p50/p95/p99/mean in ms of per-call timings (seconds), and throughput in
+    calls/second (over `wall_seconds` when calls overlapped, else the sum)
+    """
+    timings = np.asarray(timings, dtype=np.float64)
+    if timings.size == 0:
+        return {'count': 0}
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99]) * 1000
+    total = wall_seconds if wall_seconds else timings.sum()
+    return {
+        'count': int(timings.size),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'mean_ms': float(timings.mean() * 1000),
+        'throughput_per_s': float(timings.size / total) if total > 0 else None,
+    }
+
+
+def environment():
+    """Where the numbers come from, so results from different machines aren't mixed up"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def print_table(rows):
+    """rows: {name: summarize() output}"""
+    print(f"   {'stage':<20}{'n':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'per s':>10}")
+    for name, s in rows.items():
+        if not s.get('count'):
+            print(f"   {name:<20}{'skipped':>7}")
+            continue
+        print(f"   {name:<20}{s['count']:7d}{s['p50_ms']:10.3f}{s['p95_ms']:10.3f}{s['p99_ms']:10.3f}"
+              f"{s['throughput_per_s']:10.1f}")
+
+
+def save_results(path, results):
+    with open(path, 'w') as f:
+        json.dump(dict(results, environment=environment()), f, indent=2)
+    print(f"💾 Results saved to {path}")
+
+
+def compare(path, rows, threshold=0.10):
+    """
+    Print p50/p95 changes against a previous results file, flag anything
+    more than `threshold` slower. Returns the names of the regressed rows
+    """
+    with open(path) as f:
+        previous = json.load(f).get('stages', {})
+
+    regressions = []
+    print(f"\n📈 Compared with {path}:")
+    for name, s in rows.items():
+        old = previous.get(name)
+        if not s.get('count') or not old or not old.get('count'):
+            continue
+        changes = {key: s[key] / old[key] - 1 for key in ('p50_ms', 'p95_ms') if old[key]}
+        slower = any(change > threshold for change in changes.values())
+        if slower:
+            regressions.append(name)
+        print(f"   {'⚠️' if slower else '  '} {name:<20}"
+              + ''.join(f"{key[:3]} {change * 100:+6.1f}%   " for key, change in changes.items()))
+    return regressions
@@ -0,0 +1,109 @@
+"""
+Fixed benchmark corpus: encoded frames and their hand landmarks
+Built once from the dataset (spread across classes) so every benchmark run
+replays exactly the same inputs:
+
+    python benchmarks/fixtures.py --frames 300
+
+Stored in benchmarks/fixtures/corpus.npz: the JPEG bytes back to back with
+their offsets, the (21, 2) landmarks MediaPipe found in each frame (NaN if
+none), labels and source paths.
+"""
+import argparse
+import os
+import sys
+
+import cv2
+import numpy as np
+
+from bench_utils import BASE_DIR
+
+sys.path.insert(0, os.path.join(BASE_DIR, 'web_app'))
+
+DATA_DIR = os.path.join(BASE_DIR, 'dataset', 'Lettres_sign_ar', 'Lettres_sign_ar')
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'corpus.npz')
+
+
+class Corpus:
+    def __init__(self, jpeg, offsets, landmarks, labels, sources):
+        self.jpeg = jpeg
+        self.offsets = offsets
+        self.landmarks = landmarks
+        self.labels = labels
+        self.sources = sources
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def frame_bytes(self, i):
+        return self.jpeg[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    def hands(self):
+        """(M, 21, 2) landmarks of the frames where a hand was found"""
+        found = ~np.isnan(self.landmarks).any(axis=(1, 2))
+        return self.landmarks[found]
+
+
+def load_corpus(path=CORPUS_FILE):
+    with np.load(path, allow_pickle=False) as data:
+        return Corpus(data['jpeg'], data['offsets'], data['landmarks'], data['labels'], data['sources'])
+
+
+def build_corpus(data_dir, num_frames, width=None, quality=80, path=CORPUS_FILE):
+    """
+    Pick `num_frames` dataset images round-robin over the classes, optionally
+    resize them to `width` (camera-like frames), JPEG-encode and detect them
+    """
+    from inference_classifier import SignLanguageClassifier
+    from landmark_features import landmarks_to_array
+
+    classes = sorted(d for d in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, d)))
+    per_class = [sorted(os.listdir(os.path.join(data_dir, d))) for d in classes]
+    picks = []
+    for i in range(max(map(len, per_class), default=0)):
+        for class_dir, names in zip(classes, per_class):
+            if i < len(names) and len(picks) < num_frames:
+                picks.append((class_dir, names[i]))
+
+    classifier = SignLanguageClassifier(batch_max_size=1, detector_pool_size=1)
+    encoded, landmarks, labels, sources = [], [], [], []
+    for class_dir, name in picks:
+        img = cv2.imread(os.path.join(data_dir, class_dir, name))
+        if img is None:
+            continue
+        if width:
+            img = cv2.resize(img, (width, round(img.shape[0] * width / img.shape[1])))
+        ok, buf = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            continue
+
+        result = classifier.detect(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+        hand = np.full((21, 2), np.nan, dtype=np.float32)
+        if result.hand_landmarks:
+            hand = landmarks_to_array(result.hand_landmarks[0])
+
+        encoded.append(buf.ravel())
+        landmarks.append(hand)
+        labels.append(class_dir)
+        sources.append(os.path.join(class_dir, name))
+
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(buf) for buf in encoded])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.savez(path, jpeg=np.concatenate(encoded) if encoded else np.zeros(0, np.uint8), offsets=offsets,
+             landmarks=np.asarray(landmarks, dtype=np.float32).reshape(-1, 21, 2),
+             labels=np.asarray(labels, dtype=str), sources=np.asarray(sources, dtype=str))
+    return load_corpus(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--width', type=int, default=None, help='Resize frames to this width (e.g. 640)')
+    parser.add_argument('--quality', type=int, default=80, help='JPEG quality of the stored frames')
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.data_dir, args.frames, args.width, args.quality)
+    print(f"💾 {len(corpus)} frames ({len(corpus.hands())} with a hand, "
+          f"{len(corpus.jpeg) / 1e6:.1f} MB) saved to {CORPUS_FILE}")
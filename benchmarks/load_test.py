@@ -0,0 +1,154 @@
+"""
+End-to-end load test of a running server, replaying the fixture corpus
+N client threads each keep one HTTP connection open and send frames back to
+back for --duration seconds; reports latency percentiles, throughput and errors.
+
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --clients 8
+    python benchmarks/load_test.py --start --endpoint predict_landmarks --output load.json
+
+--start launches gunicorn with web_app/gunicorn.conf.py on a free local port
+for the duration of the test.
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+from bench_utils import BASE_DIR, compare, print_table, save_results, summarize
+from fixtures import CORPUS_FILE, load_corpus
+
+
+def request_bodies(corpus, endpoint):
+    """(path, content type, body) of every request the clients cycle through"""
+    if endpoint == 'predict':
+        return [('/predict', 'image/jpeg', corpus.frame_bytes(i)) for i in range(len(corpus))]
+    return [('/predict_landmarks', 'application/json', json.dumps({'landmarks': hand.tolist()}).encode())
+            for hand in corpus.hands()]
+
+
+def client(url, bodies, offset, deadline, timings, errors, lock):
+    parsed = urllib.parse.urlsplit(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+    i = offset
+    local_timings = []
+    local_errors = 0
+    while time.perf_counter() < deadline:
+        path, content_type, body = bodies[i % len(bodies)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request('POST', path, body=body, headers={'Content-Type': content_type})
+            response = conn.getresponse()
+            payload = response.read()
+            elapsed = time.perf_counter() - start
+            # Errors come back as 200 with an "error" field
+            if response.status != 200 or b'"error"' in payload:
+                local_errors += 1
+            else:
+                local_timings.append(elapsed)
+        except (OSError, http.client.HTTPException):
+            local_errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+    conn.close()
+    with lock:
+        timings.extend(local_timings)
+        errors[0] += local_errors
+
+
+def run_load(url, bodies, clients, duration):
+    timings, errors, lock = [], [0], threading.Lock()
+    start = time.perf_counter()
+    deadline = start + duration
+    threads = [threading.Thread(target=client, args=(url, bodies, i * len(bodies) // clients, deadline,
+                                                     timings, errors, lock))
+               for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return timings, errors[0], time.perf_counter() - start
+
+
+def start_server(timeout=90):
+    """Start gunicorn on a free local port, returns (process, url) once / answers"""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app', '--bind', f'127.0.0.1:{port}'],
+        cwd=os.path.join(BASE_DIR, 'web_app'), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("gunicorn exited during startup")
+        try:
+            urllib.request.urlopen(url + '/', timeout=2).read()
+            return process, url
+        except OSError:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"Server didn't answer within {timeout}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--start', action='store_true', help='Start a local gunicorn instead of using --url')
+    parser.add_argument('--endpoint', choices=['predict', 'predict_landmarks'], default='predict')
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--duration', type=float, default=15.0, help='Seconds per client count')
+    parser.add_argument('--corpus', default=CORPUS_FILE)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--compare', help='Previous results file to compare against')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.corpus):
+        print(f"❌ No corpus at {args.corpus}, build it with benchmarks/fixtures.py")
+        return 1
+    bodies = request_bodies(load_corpus(args.corpus), args.endpoint)
+    if not bodies:
+        print("❌ The corpus has no frames with a hand")
+        return 1
+
+    process, url = None, args.url
+    if args.start:
+        process, url = start_server()
+        print(f"🚀 Started gunicorn at {url}")
+
+    stages = {}
+    try:
+        # Unmeasured warm-up: lazy worker threads, detectors and caches
+        run_load(url, bodies, max(args.clients), 2.0)
+        for clients in args.clients:
+            timings, errors, wall = run_load(url, bodies, clients, args.duration)
+            summary = summarize(timings, wall)
+            summary['errors'] = errors
+            summary['clients'] = clients
+            stages[f'{args.endpoint}_c{clients}'] = summary
+            print(f"   {clients} clients: {len(timings)} ok, {errors} errors in {wall:.1f}s")
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=30)
+
+    print_table(stages)
+    if args.output:
+        save_results(args.output, {'url': url, 'endpoint': args.endpoint, 'duration': args.duration,
+                                   'stages': stages})
+    if args.compare:
+        return 1 if compare(args.compare, stages) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,8 @@
+import json
 import os
-import pickle
+import sys
+import time
+import multiprocessing
 import mediapipe as mp
 import cv2
 import numpy as np
@@ -7,25 +10,50 @@ import concurrent.futures
 from mediapipe.tasks import python
 from mediapipe.tasks.python import vision
 
+# Feature extraction is shared with the web app so train/serve features match
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'web_app'))
+from landmark_features import build_features, landmarks_to_array
+from feature_dataset import DATASET_DIR, detector_metadata, file_sha1, write_dataset
+from landmark_cache import LandmarkCache
+
+MIN_DETECTION_CONFIDENCE = 0.5
+
+# Results are checkpointed to the landmark cache every CHECKPOINT_EVERY images
+# or CHECKPOINT_SECONDS, whichever comes first
+CHECKPOINT_EVERY = 500
+CHECKPOINT_SECONDS = 30.0
+
+# Chunk size tuning: each chunk should keep a worker busy for about this long
+TARGET_CHUNK_SECONDS = 0.5
+
 # Global init for workers
 detector = None
 
-def init_worker(model_path):
+def init_worker(model_path, min_detection_confidence=MIN_DETECTION_CONFIDENCE):
     global detector
     base_options = python.BaseOptions(model_asset_path=model_path)
     options = vision.HandLandmarkerOptions(
         base_options=base_options,
         num_hands=1,
-        min_hand_detection_confidence=0.5)
+        min_hand_detection_confidence=min_detection_confidence)
     detector = vision.HandLandmarker.create_from_options(options)
 
-def process_image(args):
-    img_path, class_label = args
+def process_image(task):
+    """
+    Detect the hand in one image
+    Returns (sha1, landmarks, reason, seconds): landmarks is a (21, 2) array
+    or None, reason is None on success, 'no_hand', 'decode_failed' or
+    'error: <message>'. Only detector answers (landmarks or no_hand) are cached,
+    failures are retried on the next run.
+    """
+    img_path, sha1 = task
     global detector
-    
+
+    start = time.perf_counter()
     try:
         img = cv2.imread(img_path)
-        if img is None: return None
+        if img is None:
+            return (sha1, None, 'decode_failed', time.perf_counter() - start)
 
         img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
         mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=img_rgb)
@@ -34,81 +62,178 @@ def process_image(args):
         
         if results.hand_landmarks:
             hand_landmarks = results.hand_landmarks[0]
-            data_aux = []
-            x_ = []
-            y_ = []
+            return (sha1, landmarks_to_array(hand_landmarks), None, time.perf_counter() - start)
+        return (sha1, None, 'no_hand', time.perf_counter() - start)
+    except Exception as e:
+        return (sha1, None, f'error: {e}', time.perf_counter() - start)
 
-            for landmark in hand_landmarks:
-                x_.append(landmark.x)
-                y_.append(landmark.y)
+def tune_chunksize(seconds_per_image, remaining, workers, target_seconds=TARGET_CHUNK_SECONDS):
+    """
+    imap chunk size from the measured per-image time: chunks of about
+    `target_seconds` of work amortize the IPC, but never so large that fewer
+    than 4 chunks per worker are left to balance the load at the end
+    """
+    by_time = int(target_seconds / max(seconds_per_image, 1e-6))
+    by_balance = remaining // (workers * 4)
+    return max(1, min(by_time, by_balance))
 
-            for landmark in hand_landmarks:
-                data_aux.append(landmark.x - min(x_))
-                data_aux.append(landmark.y - min(y_))
+def run_detection(pending, model_path, cache):
+    """
+    Stream the pending images through a worker pool, results in completion order
+    A short warm-up pass with chunksize 1 measures the per-image time used to
+    size the chunks of the rest. Results are checkpointed to `cache` as they
+    arrive; returns ({sha1: landmarks or None}, {sha1: failure reason})
+    """
+    workers = os.cpu_count() or 1
+    entries = {}
+    failures = {}
+    checkpoint = {}
+    last_checkpoint = time.monotonic()
+    started = time.monotonic()
+    done = 0
+    busy_seconds = 0.0
 
-            return (data_aux, class_label)
-    except Exception as e:
-        # print(f"Error processing {img_path}: {e}")
-        pass
-    return None
+    warmup = pending[:workers * 2]
+    rest = pending[len(warmup):]
+
+    # Note: MediaPipe Hands is not purely thread safe, best to use a process pool
+    # with the detector built once inside each worker
+    with multiprocessing.Pool(workers, initializer=init_worker,
+                              initargs=(model_path, MIN_DETECTION_CONFIDENCE)) as pool:
+        def results():
+            yield from pool.imap_unordered(process_image, warmup, chunksize=1)
+            if rest:
+                chunksize = tune_chunksize(busy_seconds / done, len(rest), workers)
+                print(f"   {busy_seconds / done * 1000:.0f} ms/image per worker, chunk size {chunksize}")
+                yield from pool.imap_unordered(process_image, rest, chunksize=chunksize)
+
+        try:
+            for sha1, hand, reason, seconds in results():
+                done += 1
+                busy_seconds += seconds
+                if reason is None or reason == 'no_hand':
+                    entries[sha1] = hand
+                    checkpoint[sha1] = hand
+                if reason is not None:
+                    failures[sha1] = reason
+
+                if len(checkpoint) >= CHECKPOINT_EVERY or time.monotonic() - last_checkpoint >= CHECKPOINT_SECONDS:
+                    cache.append(checkpoint)
+                    checkpoint = {}
+                    last_checkpoint = time.monotonic()
+                    elapsed = time.monotonic() - started
+                    eta = (len(pending) - done) * elapsed / done
+                    print(f"   {done}/{len(pending)} images ({done / elapsed:.1f}/s, ETA {eta:.0f}s), checkpoint saved")
+        finally:
+            # Keep what finished even if the run is interrupted or a worker crashes
+            cache.append(checkpoint)
+    return entries, failures
 
 def process_data():
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     DATA_DIR = os.path.join(BASE_DIR, 'dataset', 'Lettres_sign_ar', 'Lettres_sign_ar')
     MODEL_PATH = os.path.join(BASE_DIR, 'models', 'hand_landmarker.task')
-    OUTPUT_DIR = os.path.join(BASE_DIR, 'data_processed')
+    OUTPUT_DIR = os.path.dirname(DATASET_DIR)
+    CACHE_FILE = os.path.join(OUTPUT_DIR, 'landmark_cache.npz')
+    REPORT_FILE = os.path.join(OUTPUT_DIR, 'process_report.json')
     
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
 
     print(f"🚀 Starting PARALLEL Data Processing from: {DATA_DIR}")
     
-    # Collect all tasks
+    # Collect all tasks, sorted so the dataset rows come out in the same order every run
     tasks = []
-    classes = os.listdir(DATA_DIR)
+    classes = sorted(os.listdir(DATA_DIR))
     for dir_ in classes:
         class_path = os.path.join(DATA_DIR, dir_)
         if not os.path.isdir(class_path): continue
         
-        for img_name in os.listdir(class_path):
+        for img_name in sorted(os.listdir(class_path)):
             img_path = os.path.join(class_path, img_name)
             tasks.append((img_path, dir_))
             
-    print(f"   Total Images to Process: {len(tasks)}")
-    print(f"   Using {os.cpu_count()} CPU cores...")
+    print(f"   Total Images Found: {len(tasks)}")
 
-    data = []
+    # Content hashes decide which images the detector has already seen
+    print("🔎 Hashing images...")
+    with concurrent.futures.ThreadPoolExecutor() as pool:
+        hashes = list(pool.map(file_sha1, [img_path for img_path, _ in tasks]))
+
+    meta = detector_metadata(MODEL_PATH, MIN_DETECTION_CONFIDENCE)
+    cache = LandmarkCache(CACHE_FILE, meta)
+    if cache.stale:
+        print("   Detector settings changed, landmark cache discarded")
+    if cache.resumed:
+        print(f"   Resuming: {cache.resumed} images checkpointed by an interrupted run")
+
+    entries = {}
+    pending = []
+    queued = set()
+    for (img_path, _), sha1 in zip(tasks, hashes):
+        if sha1 in cache:
+            entries[sha1] = cache.get(sha1)
+        elif sha1 not in queued:  # Duplicate images are detected once
+            queued.add(sha1)
+            pending.append((img_path, sha1))
+    reused = len(entries)
+
+    print(f"   Reused from cache: {reused} | To process: {len(pending)}")
+
+    failures = {}
+    if pending:
+        print(f"   Using {os.cpu_count()} CPU cores...")
+        fresh, failures = run_detection(pending, MODEL_PATH, cache)
+        entries.update(fresh)
+
+    dropped = cache.save(entries)
+    if dropped:
+        print(f"   Dropped {dropped} deleted images from the landmark cache")
+
+    # Assemble the dataset from cached and fresh landmarks, one vectorized feature pass
+    points = []
     labels = []
-    
-    # Run in parallel
-    # Note: MediaPipe Hands is not purely thread safe, best to use ProcessPool
-    # However, passing 'detector' is hard.
-    # Better strategy: Init detector inside worker.
-    
-    chunk_size = max(1, len(tasks) // (os.cpu_count() * 4))
-    
-    with concurrent.futures.ProcessPoolExecutor(initializer=init_worker, initargs=(MODEL_PATH,)) as executor:
-        results = list(executor.map(process_image, tasks, chunksize=chunk_size))
-        
-    # Collect results
-    valid_count = 0
-    for res in results:
-        if res:
-            d, l = res
-            data.append(d)
-            labels.append(l)
-            valid_count += 1
+    sources = []
+    kept_hashes = []
+    failed_images = []
+    for (img_path, class_label), sha1 in zip(tasks, hashes):
+        source = os.path.relpath(img_path, DATA_DIR)
+        hand = entries.get(sha1)
+        if hand is not None:
+            points.append(hand)
+            labels.append(class_label)
+            sources.append(source)
+            kept_hashes.append(sha1)
+        else:
+            # Cached "no hand" answers are reported on every run, not only the first
+            reason = failures.get(sha1, 'no_hand')
+            failed_images.append({'source': source, 'sha1': sha1, 'reason': reason})
+    features = build_features(np.asarray(points, dtype=np.float32).reshape(-1, 21, 2))
+    valid_count = len(labels)
+
+    # Failure report: counts per reason plus every image left out of the dataset
+    counts = {}
+    for failed in failed_images:
+        key = 'error' if failed['reason'].startswith('error') else failed['reason']
+        counts[key] = counts.get(key, 0) + 1
+    with open(REPORT_FILE, 'w', encoding='utf-8') as f:
+        json.dump({'images': len(tasks), 'reused': reused, 'recomputed': len(pending),
+                   'kept': valid_count, 'failures': counts, 'failed_images': failed_images},
+                  f, indent=2, ensure_ascii=False)
 
     # Save
     print(f"\n✅ Processing Complete!")
+    print(f"   Images reused: {reused}, recomputed: {len(pending)}")
     print(f"   Valid Samples Kept: {valid_count} ({(valid_count/len(tasks))*100:.1f}%)")
+    if counts:
+        print(f"   Skipped: {', '.join(f'{n} {reason}' for reason, n in sorted(counts.items()))} "
+              f"(see {os.path.relpath(REPORT_FILE, BASE_DIR)})")
     
-    with open(os.path.join(OUTPUT_DIR, 'data_arabic.pickle'), 'wb') as f:
-        pickle.dump({'data': data, 'labels': labels}, f)
-    print("   Saved to data_processed/data_arabic.pickle")
+    meta['num_images'] = len(tasks)
+    write_dataset(DATASET_DIR, features, labels, sources, kept_hashes, meta)
+    print(f"   Saved to {os.path.relpath(DATASET_DIR, BASE_DIR)}/")
 
 if __name__ == "__main__":
     # Fix for Windows multiprocessing
-    import multiprocessing
     multiprocessing.freeze_support()
     process_data()
@@ -1,35 +1,65 @@
+import argparse
 import pickle
 import numpy as np
-from sklearn.neighbors import KNeighborsClassifier
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report
 import os
+import sys
 
-def train_model():
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'web_app'))
+from tree_ensemble import CompiledForest, check_parity
+from calibration import Calibration, expected_calibration_error
+from model_registry import load_label_map, publish
+from feature_dataset import DATASET_DIR, load_dataset
+from augmentation import LandmarkAugmenter
+
+def train_model(augment_copies=0, seed=None, calibration_split=0.1):
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    DATA_FILE = os.path.join(BASE_DIR, 'data_processed', 'data_arabic.pickle')
     MODEL_FILE = os.path.join(BASE_DIR, 'models', 'model_arabic.p')
 
-    print(f"🔄 Loading data from {DATA_FILE}...")
+    print(f"🔄 Loading data from {DATASET_DIR}...")
     
-    if not os.path.exists(DATA_FILE):
-        print("❌ Data file not found! Run processing first.")
+    if not os.path.exists(DATASET_DIR):
+        print("❌ Dataset not found! Run processing first.")
         return
 
-    data_dict = pickle.load(open(DATA_FILE, 'rb'))
-    data = np.asarray(data_dict['data'])
-    labels = np.asarray(data_dict['labels'])
+    # Memory-mapped: only the rows of each split are read into memory
+    dataset = load_dataset(DATASET_DIR)
+    data = dataset.features
+    labels = np.asarray(dataset.labels)
     
     # Verify shape
     print(f"   Samples: {data.shape[0]}")
     print(f"   Features: {data.shape[1]} (Expected 42)")
+    print(f"   Detector: {dataset.meta.get('detector')} "
+          f"(confidence >= {dataset.meta.get('min_hand_detection_confidence')})")
     
-    # Split
+    # Split row indices, then gather each split from the memory map in file order
     print("✂️ Splitting data (80% Train, 20% Test)...")
-    x_train, x_test, y_train, y_test = train_test_split(
-        data, labels, test_size=0.2, shuffle=True, stratify=labels
+    train_idx, test_idx = train_test_split(
+        np.arange(len(labels)), test_size=0.2, shuffle=True, stratify=labels
     )
+    train_idx.sort()
+    test_idx.sort()
+    # Probabilities are calibrated on training rows the forest never sees
+    calib_idx = np.array([], dtype=int)
+    if calibration_split:
+        train_idx, calib_idx = train_test_split(
+            train_idx, test_size=calibration_split, shuffle=True, stratify=labels[train_idx]
+        )
+        train_idx.sort()
+        calib_idx.sort()
+        print(f"   Calibration samples: {len(calib_idx)}")
+    x_train, x_test = data[train_idx], data[test_idx]
+    y_train, y_test = labels[train_idx], labels[test_idx]
+
+    # Augment the training split only, the test set stays real detections
+    if augment_copies:
+        print(f"🔀 Augmenting training set ({augment_copies} copies per sample)...")
+        augmenter = LandmarkAugmenter(seed=seed)
+        x_train, y_train = augmenter.expand(x_train, y_train, augment_copies)
+        print(f"   Training samples: {len(x_train)}")
     
     # Train
     print("🧠 Training Random Forest (Using ALL CPUs)...")
@@ -37,14 +67,35 @@ def train_model():
     model = RandomForestClassifier(n_estimators=200, n_jobs=-1, verbose=1) 
     model.fit(x_train, y_train)
     
-    # Evaluate
+    # Per-letter Platt scaling of predict_proba, served with the model (see web_app/calibration.py)
+    calibration = None
+    if len(calib_idx):
+        print("📐 Calibrating probabilities...")
+        calibration = Calibration.fit(model.predict_proba(data[calib_idx]),
+                                      np.searchsorted(model.classes_, labels[calib_idx]))
+
+    # Evaluate what the app serves: the argmax of the calibrated probabilities,
+    # which can differ from model.predict once the columns are rescaled
     print("🧪 Testing model...")
-    y_predict = model.predict(x_test)
+    proba_raw = model.predict_proba(x_test)
+    proba = calibration.apply(proba_raw) if calibration is not None else proba_raw
+    y_predict = model.classes_[proba.argmax(axis=1)]
     acc = accuracy_score(y_test, y_predict)
     
     print(f"\n🏆 Accuracy: {acc*100:.2f}%")
     print("\n📊 Classification Report:")
     print(classification_report(y_test, y_predict))
+
+    test_columns = np.searchsorted(model.classes_, y_test)
+    ece_raw = expected_calibration_error(proba_raw, test_columns)
+    metrics = {'accuracy': float(acc), 'ece': ece_raw}
+    if calibration is not None:
+        acc_raw = accuracy_score(y_test, model.classes_[proba_raw.argmax(axis=1)])
+        ece = expected_calibration_error(proba, test_columns)
+        print(f"   Accuracy without calibration: {acc_raw*100:.2f}%")
+        print(f"   Expected calibration error on test set: {ece_raw:.4f} -> {ece:.4f}")
+        metrics.update(ece=ece, ece_uncalibrated=ece_raw, accuracy_uncalibrated=float(acc_raw),
+                       calibration_samples=len(calib_idx))
     
     # Save
     f = open(MODEL_FILE, 'wb')
@@ -52,5 +103,25 @@ def train_model():
     f.close()
     print(f"💾 Model saved to {MODEL_FILE}")
 
+    # Publish the compiled forest to the registry, running apps swap it in without a restart
+    print("⚙️ Compiling forest to NumPy arrays...")
+    forest = CompiledForest.from_sklearn(model)
+    match, max_diff = check_parity(model, forest, x_test)
+    print(f"   Parity on test set: {match*100:.2f}% labels match, max proba diff {max_diff:.2e}")
+    if match < 1.0:
+        print("❌ Compiled forest disagrees with the sklearn model, not exported.")
+        return
+    version = publish(forest, load_label_map(), calibration=calibration, metrics=dict(
+        metrics, train_samples=len(x_train), test_samples=len(x_test), augment_copies=augment_copies,
+    ))
+    print(f"🚀 Published model version {version} (now active)")
+
 if __name__ == "__main__":
-    train_model()
+    parser = argparse.ArgumentParser(description="Train the sign classifier on data_processed/features")
+    parser.add_argument('--augment', type=int, default=0, metavar='N',
+                        help='Add N augmented copies of every training sample (see augmentation.py)')
+    parser.add_argument('--seed', type=int, default=None, help='Seed of the augmentation')
+    parser.add_argument('--calibration-split', type=float, default=0.1, metavar='F',
+                        help='Fraction of the training split held out to calibrate probabilities (0 disables)')
+    args = parser.parse_args()
+    train_model(augment_copies=args.augment, seed=args.seed, calibration_split=args.calibration_split)
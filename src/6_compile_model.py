@@ -0,0 +1,45 @@
+import os
+import sys
+import pickle
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'web_app'))
+from tree_ensemble import CompiledForest, check_parity
+from feature_dataset import DATASET_DIR, load_dataset
+from model_registry import load_label_map, publish
+
+def compile_model():
+    """
+    Compile the legacy pickled model (models/model_lightgbm.p) and publish it
+    to the model registry without retraining
+    """
+    BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    MODEL_FILE = os.path.join(BASE_DIR, 'models', 'model_lightgbm.p')
+
+    if not os.path.exists(MODEL_FILE):
+        print(f"❌ Model file not found: {MODEL_FILE}")
+        return
+
+    print(f"🔄 Loading {MODEL_FILE}...")
+    model = pickle.load(open(MODEL_FILE, 'rb'))['model']
+    forest = CompiledForest.from_sklearn(model)
+    print(f"   Trees: {forest.n_trees}, Nodes: {len(forest.feature)}, Max depth: {forest.max_depth}")
+
+    # Parity check on the real features when available, random hands otherwise
+    if os.path.exists(DATASET_DIR):
+        data = load_dataset(DATASET_DIR).features
+    else:
+        rng = np.random.default_rng(0)
+        data = (rng.random((5000, model.n_features_in_)) * 0.5).astype(np.float32)
+
+    match, max_diff = check_parity(model, forest, data)
+    print(f"🧪 Parity on {len(data)} samples: {match*100:.2f}% labels match, max proba diff {max_diff:.2e}")
+    if match < 1.0:
+        print("❌ Compiled forest disagrees with the sklearn model, not exported.")
+        return
+
+    version = publish(forest, load_label_map(), metrics={'compiled_from': os.path.basename(MODEL_FILE)})
+    print(f"🚀 Published model version {version} (now active)")
+
+if __name__ == "__main__":
+    compile_model()
@@ -0,0 +1,283 @@
+"""
+Model bake-off: train several model families and hyperparameters in parallel
+on data_processed/features and measure what matters for serving:
+
+    accuracy          on the held-out 20% split
+    single_ms         p50/p95 latency of one-row predict_proba (what /predict does)
+    batch_us_per_row  per-row latency of 64-row batches (what the micro-batcher does)
+    size_kb           size of the artifact the app would load
+
+Forests are measured as the CompiledForest the app serves. The Pareto-optimal
+candidates (no other is at least as accurate, as fast and as small) are
+reported, and the fastest of them within --tolerance of the best accuracy is
+selected; --export calibrates its probabilities on training rows held out from
+every candidate and publishes it to the model registry like 4_train_model.py does.
+
+    python src/7_model_bakeoff.py --families random_forest extra_trees knn
+"""
+import argparse
+import concurrent.futures
+import io
+import itertools
+import json
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+from sklearn.ensemble import ExtraTreesClassifier, HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import KNeighborsClassifier
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'web_app'))
+from tree_ensemble import CompiledForest, check_parity
+from feature_dataset import BASE_DIR, DATASET_DIR, load_dataset
+from augmentation import LandmarkAugmenter
+from calibration import Calibration, expected_calibration_error
+from model_registry import load_label_map, publish
+
+MODEL_FILE = os.path.join(BASE_DIR, 'models', 'model_arabic.p')
+RESULTS_FILE = os.path.join(BASE_DIR, 'models', 'bakeoff_results.json')
+
+# family -> (estimator, hyperparameter grid)
+FAMILIES = {
+    'random_forest': (RandomForestClassifier, {'n_estimators': [50, 100, 200], 'max_depth': [None, 16]}),
+    'extra_trees': (ExtraTreesClassifier, {'n_estimators': [100, 200], 'max_depth': [None, 16]}),
+    'hist_gradient_boosting': (HistGradientBoostingClassifier, {'max_iter': [100, 200], 'learning_rate': [0.1]}),
+    'knn': (KNeighborsClassifier, {'n_neighbors': [3, 5]}),
+    'logistic': (LogisticRegression, {'C': [1.0, 10.0], 'max_iter': [2000]}),
+}
+
+try:
+    from lightgbm import LGBMClassifier
+    FAMILIES['lightgbm'] = (LGBMClassifier, {'n_estimators': [200], 'num_leaves': [31, 63], 'verbose': [-1]})
+except ImportError:
+    pass
+
+SINGLE_ROW_CALLS = 300
+BATCH_ROWS = 64
+
+# Training data of each worker process, sent once through the initializer
+_train = None
+
+
+def candidates(families):
+    for family in families:
+        estimator, grid = FAMILIES[family]
+        keys = sorted(grid)
+        for values in itertools.product(*(grid[key] for key in keys)):
+            yield family, dict(zip(keys, values))
+
+
+def init_worker(x_train, y_train):
+    global _train
+    _train = (x_train, y_train)
+
+
+def fit_candidate(family, params):
+    """Fit one candidate on a single core (candidates run side by side)"""
+    estimator, _ = FAMILIES[family]
+    model = estimator(**params)
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=1)
+    start = time.perf_counter()
+    model.fit(*_train)
+    return model, time.perf_counter() - start
+
+
+def serving_form(model, x_test):
+    """
+    What the app would load: the compiled forest when the model is a tree
+    ensemble it reproduces exactly, the estimator itself otherwise
+    Returns (predictor, artifact size in bytes)
+    """
+    try:
+        forest = CompiledForest.from_sklearn(model)
+    except (TypeError, AttributeError):
+        forest = None
+    if forest is not None and check_parity(model, forest, x_test)[0] == 1.0:
+        buffer = io.BytesIO()
+        forest.save(buffer)
+        return forest, buffer.tell()
+    return model, len(pickle.dumps({'model': model}))
+
+
+def measure_latency(predictor, x_test):
+    """(p50, p95) ms of one-row predict_proba, µs per row of BATCH_ROWS-row batches"""
+    rows = x_test[np.arange(SINGLE_ROW_CALLS) % len(x_test)]
+    predictor.predict_proba(rows[:1])  # warm-up
+
+    timings = np.empty(SINGLE_ROW_CALLS)
+    for i in range(SINGLE_ROW_CALLS):
+        start = time.perf_counter()
+        predictor.predict_proba(rows[i:i + 1])
+        timings[i] = time.perf_counter() - start
+
+    batch = x_test[np.arange(BATCH_ROWS) % len(x_test)]
+    batch_timings = []
+    for _ in range(20):
+        start = time.perf_counter()
+        predictor.predict_proba(batch)
+        batch_timings.append(time.perf_counter() - start)
+
+    p50, p95 = np.percentile(timings, [50, 95]) * 1000
+    return p50, p95, np.median(batch_timings) / BATCH_ROWS * 1e6
+
+
+def pareto_front(results):
+    """Results no other result beats or ties on accuracy, single-row p50 and size at once"""
+    def dominates(a, b):
+        no_worse = (a['accuracy'] >= b['accuracy'] and a['single_ms_p50'] <= b['single_ms_p50']
+                    and a['size_kb'] <= b['size_kb'])
+        better = (a['accuracy'] > b['accuracy'] or a['single_ms_p50'] < b['single_ms_p50']
+                  or a['size_kb'] < b['size_kb'])
+        return no_worse and better
+    return [r for r in results if not any(dominates(other, r) for other in results)]
+
+
+def select(front, tolerance):
+    """Fastest Pareto candidate whose accuracy is within `tolerance` of the best"""
+    best = max(r['accuracy'] for r in front)
+    eligible = [r for r in front if r['accuracy'] >= best - tolerance]
+    return min(eligible, key=lambda r: (r['single_ms_p50'], r['size_kb']))
+
+
+def bakeoff(families, tolerance, augment_copies=0, seed=None, workers=None, export=False, output=RESULTS_FILE,
+            calibration_split=0.1):
+    print(f"🔄 Loading data from {DATASET_DIR}...")
+    if not os.path.exists(DATASET_DIR):
+        print("❌ Dataset not found! Run processing first.")
+        return
+
+    dataset = load_dataset(DATASET_DIR)
+    labels = np.asarray(dataset.labels)
+    train_idx, test_idx = train_test_split(
+        np.arange(len(labels)), test_size=0.2, shuffle=True, stratify=labels, random_state=seed
+    )
+    train_idx.sort()
+    test_idx.sort()
+    # The app serves calibrated probabilities, fitted on training rows no candidate sees
+    calib_idx = np.array([], dtype=int)
+    if calibration_split:
+        train_idx, calib_idx = train_test_split(
+            train_idx, test_size=calibration_split, shuffle=True, stratify=labels[train_idx], random_state=seed
+        )
+        train_idx.sort()
+        calib_idx.sort()
+    if export and not len(calib_idx):
+        print("❌ --export needs a calibration split (--calibration-split > 0).")
+        return
+    x_train, x_test = dataset.features[train_idx], dataset.features[test_idx]
+    y_train, y_test = labels[train_idx], labels[test_idx]
+    if augment_copies:
+        x_train, y_train = LandmarkAugmenter(seed=seed).expand(x_train, y_train, augment_copies)
+    print(f"   Train: {len(x_train)} | Calibration: {len(calib_idx)} | Test: {len(x_test)}")
+
+    jobs = list(candidates(families))
+    print(f"🏁 Training {len(jobs)} candidates in parallel...")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                                initargs=(x_train, y_train)) as executor:
+        futures = {executor.submit(fit_candidate, family, params): (family, params) for family, params in jobs}
+        fitted = []
+        for future in concurrent.futures.as_completed(futures):
+            family, params = futures[future]
+            try:
+                model, fit_seconds = future.result()
+            except Exception as e:
+                print(f"   ⚠️ {family} {params} failed: {e}")
+                continue
+            print(f"   trained {family} {params} in {fit_seconds:.1f}s")
+            fitted.append((family, params, model, fit_seconds))
+
+    # Latency is measured one candidate at a time, after training, so they don't compete for cores
+    print("⏱️ Measuring inference latency...")
+    results = []
+    models = {}
+    for family, params, model, fit_seconds in sorted(fitted, key=lambda f: (f[0], str(f[1]))):
+        predictor, size = serving_form(model, x_test)
+        accuracy = accuracy_score(y_test, model.predict(x_test))
+        p50, p95, batch_us = measure_latency(predictor, x_test)
+        name = family + ''.join(f" {key}={value}" for key, value in params.items() if key != 'verbose')
+        models[name] = model
+        results.append({
+            'name': name,
+            'family': family,
+            'params': params,
+            'compiled': isinstance(predictor, CompiledForest),
+            'accuracy': float(accuracy),
+            'single_ms_p50': float(p50),
+            'single_ms_p95': float(p95),
+            'batch_us_per_row': float(batch_us),
+            'size_kb': size / 1024,
+            'fit_seconds': fit_seconds,
+        })
+    if not results:
+        print("❌ No candidate could be trained.")
+        return
+
+    front = pareto_front(results)
+    chosen = select(front, tolerance)
+    front_names = {r['name'] for r in front}
+
+    print(f"\n{'':2}{'model':<56}{'acc %':>8}{'p50 ms':>9}{'p95 ms':>9}{'batch µs':>10}{'size KB':>10}")
+    for r in sorted(results, key=lambda r: -r['accuracy']):
+        mark = '★' if r is chosen else ('•' if r['name'] in front_names else ' ')
+        print(f"{mark:2}{r['name']:<56}{r['accuracy'] * 100:8.2f}{r['single_ms_p50']:9.3f}"
+              f"{r['single_ms_p95']:9.3f}{r['batch_us_per_row']:10.1f}{r['size_kb']:10.0f}")
+    print(f"\n• Pareto-optimal   ★ selected (fastest within {tolerance * 100:.1f}% of the best accuracy)")
+    print(f"🏆 {chosen['name']}: {chosen['accuracy'] * 100:.2f}%, {chosen['single_ms_p50']:.3f} ms per frame")
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump({'tolerance': tolerance, 'train_samples': len(x_train), 'test_samples': len(x_test),
+                       'selected': chosen['name'], 'pareto_front': sorted(front_names), 'results': results},
+                      f, indent=2)
+        print(f"💾 Results saved to {output}")
+
+    if export:
+        model = models[chosen['name']]
+        print("📐 Calibrating probabilities...")
+        calibration = Calibration.fit(model.predict_proba(dataset.features[calib_idx]),
+                                      np.searchsorted(model.classes_, labels[calib_idx]))
+        # Accuracy of what the app serves, the argmax of the calibrated probabilities
+        proba_raw = model.predict_proba(x_test)
+        proba = calibration.apply(proba_raw)
+        test_columns = np.searchsorted(model.classes_, y_test)
+        accuracy = accuracy_score(y_test, model.classes_[proba.argmax(axis=1)])
+        ece_raw = expected_calibration_error(proba_raw, test_columns)
+        ece = expected_calibration_error(proba, test_columns)
+        print(f"   Calibrated accuracy: {accuracy * 100:.2f}% | "
+              f"Expected calibration error: {ece_raw:.4f} -> {ece:.4f}")
+
+        with open(MODEL_FILE, 'wb') as f:
+            pickle.dump({'model': model}, f)
+        print(f"💾 Model saved to {MODEL_FILE}")
+        # Compiled when the compiled forest reproduces it, pickled otherwise
+        artifact = CompiledForest.from_sklearn(model) if chosen['compiled'] else model
+        version = publish(artifact, load_label_map(), calibration=calibration, metrics={
+            'accuracy': float(accuracy), 'accuracy_uncalibrated': chosen['accuracy'], 'ece': ece,
+            'ece_uncalibrated': ece_raw, 'calibration_samples': len(calib_idx),
+            'single_ms_p50': chosen['single_ms_p50'], 'candidate': chosen['name'],
+        })
+        print(f"🚀 Published model version {version} (now active)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--families', nargs='+', choices=sorted(FAMILIES), default=sorted(FAMILIES))
+    parser.add_argument('--tolerance', type=float, default=0.005,
+                        help='Accuracy the selection may give up for speed (default 0.005 = 0.5%%)')
+    parser.add_argument('--augment', type=int, default=0, metavar='N',
+                        help='Augmented copies of every training sample')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help='Parallel training processes')
+    parser.add_argument('--output', default=RESULTS_FILE, help='JSON results file')
+    parser.add_argument('--export', action='store_true', help='Publish the selected model for the app')
+    parser.add_argument('--calibration-split', type=float, default=0.1, metavar='F',
+                        help='Fraction of the training split held out to calibrate probabilities (default 0.1)')
+    args = parser.parse_args()
+    bakeoff(args.families, args.tolerance, args.augment, args.seed, args.workers, args.export, args.output,
+            args.calibration_split)
@@ -0,0 +1,89 @@
+"""
+Training-time augmentation on hand landmarks
+Works on (N, 21, 2) landmark arrays (or the 42-feature rows, which are the same
+points translated to the origin), so new samples cost a few vectorized NumPy
+ops instead of image edits plus another MediaPipe pass. Each sample gets its
+own random transform around the hand centroid:
+
+    rotation        +-max_rotation degrees
+    scale           uniform in scale_range
+    aspect          x stretched by a factor in aspect_range (camera aspect, hand shape)
+    mirror          x flipped with probability mirror_prob (left-handed signers)
+    noise           Gaussian jitter of noise_std per coordinate (detector noise)
+
+Augmented points go back through build_features, so features stay identical in
+form to what the web app computes.
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'web_app'))
+from landmark_features import NUM_FEATURES, NUM_LANDMARKS, build_features
+
+
+class LandmarkAugmenter:
+    def __init__(self, max_rotation=10.0, scale_range=(0.9, 1.1), aspect_range=(0.9, 1.1),
+                 mirror_prob=0.5, noise_std=0.004, seed=None):
+        self.max_rotation = np.deg2rad(max_rotation)
+        self.scale_range = scale_range
+        self.aspect_range = aspect_range
+        self.mirror_prob = mirror_prob
+        self.noise_std = noise_std
+        self.rng = np.random.default_rng(seed)
+
+    def augment(self, points):
+        """Randomly transformed copy of (N, 21, 2) points"""
+        points = np.asarray(points, dtype=np.float32).reshape(-1, NUM_LANDMARKS, 2)
+        n = points.shape[0]
+        rng = self.rng
+
+        angle = rng.uniform(-self.max_rotation, self.max_rotation, n)
+        scale = rng.uniform(*self.scale_range, n)
+        aspect = rng.uniform(*self.aspect_range, n)
+        mirror = np.where(rng.random(n) < self.mirror_prob, -1.0, 1.0)
+
+        # One 2x2 matrix per sample: rotate, then scale x and y (mirroring flips x)
+        cos, sin = np.cos(angle), np.sin(angle)
+        transform = np.empty((n, 2, 2), dtype=np.float32)
+        transform[:, 0, 0] = cos * scale * aspect * mirror
+        transform[:, 0, 1] = -sin * scale * aspect * mirror
+        transform[:, 1, 0] = sin * scale
+        transform[:, 1, 1] = cos * scale
+
+        centroid = points.mean(axis=1, keepdims=True)
+        out = np.matmul(points - centroid, transform.transpose(0, 2, 1)) + centroid
+        if self.noise_std:
+            out += rng.normal(0.0, self.noise_std, out.shape).astype(np.float32)
+        return out
+
+    def batches(self, features, labels, copies, batch_size=4096):
+        """
+        Yield (features, labels) batches of `copies` augmented versions of
+        every row, `batch_size` rows at a time
+        """
+        features = np.asarray(features, dtype=np.float32).reshape(-1, NUM_FEATURES)
+        labels = np.asarray(labels)
+        for _ in range(copies):
+            for start in range(0, len(features), batch_size):
+                batch = features[start:start + batch_size]
+                yield build_features(self.augment(batch)), labels[start:start + batch_size]
+
+    def expand(self, features, labels, copies, batch_size=4096):
+        """
+        Original rows followed by `copies` augmented versions of each, filled
+        batch by batch into one preallocated float32 matrix
+        """
+        n = len(features)
+        out = np.empty(((copies + 1) * n, NUM_FEATURES), dtype=np.float32)
+        out_labels = np.empty((copies + 1) * n, dtype=np.asarray(labels).dtype)
+        out[:n] = features
+        out_labels[:n] = labels
+
+        offset = n
+        for batch, batch_labels in self.batches(features, labels, copies, batch_size):
+            out[offset:offset + len(batch)] = batch
+            out_labels[offset:offset + len(batch)] = batch_labels
+            offset += len(batch)
+        return out, out_labels
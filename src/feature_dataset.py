@@ -0,0 +1,142 @@
+"""
+Columnar on-disk format of the processed landmark features
+A dataset is a directory of plain .npy columns plus a JSON header:
+
+    features.npy   float32 (N, 42)  build_features() output, one row per image
+    labels.npy     str     (N,)     class folder name
+    sources.npy    str     (N,)     image path relative to the dataset root
+    hashes.npy     bytes   (N,)     sha1 of the image file
+    meta.json               format version, detector and threshold, counts
+
+Columns are memory-mapped on load, so training only pages in the rows it uses.
+Convert an old data_arabic.pickle with:
+
+    python src/feature_dataset.py data_processed/data_arabic.pickle
+"""
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+import time
+
+import numpy as np
+
+FORMAT_VERSION = 1
+NUM_FEATURES = 42
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASET_DIR = os.path.join(BASE_DIR, 'data_processed', 'features')
+
+_COLUMNS = ('features', 'labels', 'sources', 'hashes')
+
+
+class FeatureDataset:
+    def __init__(self, features, labels, sources, hashes, meta):
+        self.features = features
+        self.labels = labels
+        self.sources = sources
+        self.hashes = hashes
+        self.meta = meta
+
+    def __len__(self):
+        return len(self.features)
+
+
+def file_sha1(path, chunk_size=1 << 20):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def detector_metadata(model_path, min_detection_confidence):
+    """Header fields identifying the landmark extractor the features came from"""
+    import mediapipe as mp
+    return {
+        'detector': os.path.basename(model_path),
+        'detector_sha1': file_sha1(model_path) if os.path.exists(model_path) else None,
+        'mediapipe_version': getattr(mp, '__version__', None),
+        'min_hand_detection_confidence': min_detection_confidence,
+    }
+
+
+def write_dataset(path, features, labels, sources, hashes, meta=None):
+    """
+    Write the columns and header to `path`
+    Written to a sibling directory first and swapped in, so a crash never leaves
+    a half-written dataset behind
+    """
+    features = np.ascontiguousarray(features, dtype=np.float32)
+    if features.ndim != 2 or features.shape[1] != NUM_FEATURES:
+        raise ValueError(f"Expected features of shape (N, {NUM_FEATURES}), got {features.shape}")
+    columns = {
+        'features': features,
+        'labels': np.asarray(labels, dtype=str),
+        'sources': np.asarray(sources, dtype=str),
+        'hashes': np.asarray(hashes, dtype='S40'),
+    }
+    for name, column in columns.items():
+        if len(column) != len(features):
+            raise ValueError(f"Column '{name}' has {len(column)} rows, features have {len(features)}")
+
+    header = dict(meta or {})
+    header.update({
+        'format_version': FORMAT_VERSION,
+        'num_samples': int(len(features)),
+        'num_features': NUM_FEATURES,
+        'classes': sorted(set(columns['labels'].tolist())),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    })
+
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name, column in columns.items():
+        np.save(os.path.join(tmp_path, name + '.npy'), column, allow_pickle=False)
+    with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(header, f, indent=2, ensure_ascii=False)
+
+    old_path = path + '.old'
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return header
+
+
+def load_dataset(path=DATASET_DIR, mmap=True):
+    """
+    Open a dataset written by write_dataset
+    Columns are read-only memory maps unless mmap=False
+    """
+    with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported dataset format {meta.get('format_version')} in {path}")
+
+    mmap_mode = 'r' if mmap else None
+    columns = [np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode, allow_pickle=False)
+               for name in _COLUMNS]
+    return FeatureDataset(*columns, meta)
+
+
+def convert_pickle(pickle_path, path=DATASET_DIR):
+    """Convert a legacy {'data': [...], 'labels': [...]} pickle, sources and hashes are unknown"""
+    with open(pickle_path, 'rb') as f:
+        data_dict = pickle.load(f)
+    features = np.asarray(data_dict['data'], dtype=np.float32)
+    empty = [''] * len(features)
+    return write_dataset(path, features, data_dict['labels'], empty, empty,
+                         {'converted_from': os.path.basename(pickle_path)})
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(1)
+    header = convert_pickle(sys.argv[1])
+    print(f"💾 Converted {header['num_samples']} samples to {DATASET_DIR}")
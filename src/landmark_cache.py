@@ -0,0 +1,94 @@
+"""
+Landmark cache of the data pipeline, keyed by image content hash
+Stores the raw (21, 2) hand landmarks MediaPipe found in every image (NaN when
+no hand was found, so those aren't retried either). 3_process_data.py only runs
+the detector on images whose hash isn't cached; renamed or moved images hit the
+cache, deleted ones are dropped when the cache is saved. The whole cache is
+discarded when the detector, its threshold or the MediaPipe version change.
+
+While a run is in progress, results are appended as small checkpoint files in
+`<cache>_parts/`. They are loaded with the cache, so an interrupted run resumes
+where it stopped, and folded into the main file by save().
+"""
+import glob
+import json
+import os
+import shutil
+
+import numpy as np
+
+NUM_LANDMARKS = 21
+
+# Detector settings a cached landmark depends on
+_KEY_FIELDS = ('detector_sha1', 'mediapipe_version', 'min_hand_detection_confidence')
+
+
+class LandmarkCache:
+    def __init__(self, path, detector_meta):
+        self.path = path
+        self.parts_dir = os.path.splitext(path)[0] + '_parts'
+        self.meta = {field: detector_meta.get(field) for field in _KEY_FIELDS}
+        self._entries = {}
+        self.stale = False
+        self.resumed = 0
+
+        if os.path.exists(path):
+            self.stale = not self._load(path)
+        for part in sorted(glob.glob(os.path.join(self.parts_dir, 'part_*.npz'))):
+            before = len(self._entries)
+            if self._load(part):
+                self.resumed += len(self._entries) - before
+        self._num_parts = len(glob.glob(os.path.join(self.parts_dir, 'part_*.npz')))
+
+    def __contains__(self, sha1):
+        return sha1 in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, sha1):
+        """Cached (21, 2) landmarks, None if no hand was found"""
+        return self._entries[sha1]
+
+    def append(self, entries):
+        """Checkpoint `entries` ({sha1: landmarks or None}) in a new part file"""
+        if not entries:
+            return
+        os.makedirs(self.parts_dir, exist_ok=True)
+        self._write(os.path.join(self.parts_dir, f'part_{self._num_parts:06d}.npz'), entries)
+        self._num_parts += 1
+        self._entries.update(entries)
+
+    def save(self, entries):
+        """
+        Replace the cache with `entries` ({sha1: landmarks or None}), i.e. the
+        images of the current run: anything not in it is dropped
+        Returns the number of dropped entries
+        """
+        dropped = sum(1 for sha1 in self._entries if sha1 not in entries)
+        self._write(self.path, entries)
+        shutil.rmtree(self.parts_dir, ignore_errors=True)
+        self._num_parts = 0
+        self._entries = dict(entries)
+        return dropped
+
+    def _load(self, path):
+        # Returns False if the file was written with other detector settings
+        with np.load(path, allow_pickle=False) as data:
+            if json.loads(str(data['meta'])) != self.meta:
+                return False
+            for sha1, hand in zip(data['hashes'].tolist(), data['points']):
+                self._entries[sha1.decode()] = None if np.isnan(hand).any() else hand
+        return True
+
+    def _write(self, path, entries):
+        hashes = np.array(list(entries), dtype='S40')
+        points = np.full((len(entries), NUM_LANDMARKS, 2), np.nan, dtype=np.float32)
+        for i, hand in enumerate(entries.values()):
+            if hand is not None:
+                points[i] = hand
+
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, hashes=hashes, points=points, meta=np.array(json.dumps(self.meta)))
+        os.replace(tmp_path, path)
@@ -0,0 +1,65 @@
+"""
+Parity of the compiled forest with the scikit-learn model it was built from
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'web_app'))
+from tree_ensemble import CompiledForest, check_parity
+
+
+def make_data(seed=0, rows=600, features=42, classes=('ا', 'ب', 'ت', 'ث', 'ج')):
+    """Landmark-like features with overlapping classes, so the trees are deep and the leaves impure"""
+    rng = np.random.default_rng(seed)
+    y = rng.choice(np.array(classes), size=rows)
+    centers = {label: rng.random(features) for label in classes}
+    x = np.stack([centers[label] for label in y]) + rng.normal(scale=0.3, size=(rows, features))
+    return x.astype(np.float32), y
+
+
+# Leaf probabilities are stored as float32
+PROBA_TOLERANCE = 1e-6
+
+
+class CompiledForestParityTest(unittest.TestCase):
+    def assert_parity(self, model):
+        x, y = make_data()
+        x_train, x_test = x[:400], x[400:]
+        model.fit(x_train, y[:400])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'forest.npz')
+            CompiledForest.from_sklearn(model).save(path)
+            forest = CompiledForest.load(path)
+
+        np.testing.assert_array_equal(forest.classes_, model.classes_)
+        np.testing.assert_allclose(forest.predict_proba(x_test), model.predict_proba(x_test),
+                                   rtol=0, atol=PROBA_TOLERANCE)
+        np.testing.assert_array_equal(forest.predict(x_test), model.predict(x_test))
+        # One (42,) row, as the app classifies a single hand
+        np.testing.assert_allclose(forest.predict_proba(x_test[0]), model.predict_proba(x_test[:1]),
+                                   rtol=0, atol=PROBA_TOLERANCE)
+
+        match, max_diff = check_parity(model, forest, x_test)
+        self.assertEqual(match, 1.0)
+        self.assertLess(max_diff, PROBA_TOLERANCE)
+
+    def test_random_forest(self):
+        self.assert_parity(RandomForestClassifier(n_estimators=25, random_state=0))
+
+    def test_random_forest_max_depth(self):
+        self.assert_parity(RandomForestClassifier(n_estimators=25, max_depth=6, random_state=0))
+
+    def test_extra_trees(self):
+        self.assert_parity(ExtraTreesClassifier(n_estimators=25, random_state=0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,23 +1,136 @@
-from flask import Flask, render_template, request, jsonify, send_file, abort
+import time
+LOAD_START = time.perf_counter()  # Startup timing, see tabsirah_startup_seconds
+
+from flask import Flask, Response, render_template, request, jsonify, abort
+from flask_sock import Sock
+from frame_decoding import FRAME_MIMETYPES, decode_frame
 from inference_classifier import SignLanguageClassifier
+from landmark_features import build_features, landmarks_to_array
+from load_control import LoadController
+from metrics import (DECODE_FAILURES, FRAMES, REGISTRY, REQUEST_ERRORS, REQUEST_SECONDS, STAGE_SECONDS,
+                     STREAM_SESSIONS, timed)
+from recognizer import SequenceRecognizer
+from response_encoding import FORMATS, JSON, MEDIA_TYPES, encode_response, hands_array
+from sign_store import SignImageStore
+from streaming import StreamSession
 from surah_data import SURAHS, get_all_surahs, get_surah, is_surah_unlocked
-import cv2
+from verse_plans import VersePlanner
 import numpy as np
 import base64
+import binascii
+import json
 import os
-import glob
+import threading
 
 app = Flask(__name__)
 app.config['JSON_AS_ASCII'] = False  # Ensure Arabic characters are not escaped in JSON
+sock = Sock(app)
+
+# Micro-batching of concurrent predictions (BATCH_MAX_SIZE=1 disables it)
+BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', '16'))
+BATCH_MAX_WAIT_MS = float(os.environ.get('BATCH_MAX_WAIT_MS', '2'))
+
+# Prediction cache keyed by quantized hand pose (CACHE_MAX_ENTRIES=0 disables it)
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', '4096'))
+CACHE_TTL_SECONDS = float(os.environ.get('CACHE_TTL_SECONDS', '300'))
+CACHE_QUANTUM = float(os.environ.get('CACHE_QUANTUM', '0.005'))
+
+# One HandLandmarker per concurrent request, defaults to the gunicorn thread count
+DETECTOR_POOL_SIZE = int(os.environ.get('DETECTOR_POOL_SIZE', os.environ.get('GUNICORN_THREADS', '2')))
+
+# Seconds between checks of models/registry/manifest.json for a new active model (0 = only on admin reload)
+MODEL_CHECK_INTERVAL = float(os.environ.get('MODEL_CHECK_INTERVAL', '5'))
+
+# Longest side a JPEG frame is decoded at, larger uploads use reduced decoding (0 = full size)
+MAX_FRAME_DIM = int(os.environ.get('MAX_FRAME_DIM', '640'))
+
+# Most likely letters (with calibrated probabilities) returned by /predict and /predict_landmarks
+PREDICTION_TOP_K = int(os.environ.get('PREDICTION_TOP_K', '3'))
+
+# Request latency at which the worker counts as saturated, clients are told to back off above half of it
+LOAD_TARGET_LATENCY_MS = float(os.environ.get('LOAD_TARGET_LATENCY_MS', '100'))
+
+# Frames streamed over /ws/predict are detected around the previous frame's hand (0 = full frame every time)
+ROI_TRACKING = os.environ.get('ROI_TRACKING', '1') == '1'
+# Streams tracked at once, each with its own VIDEO-mode HandLandmarker; further streams share the detector pool
+TRACKER_LIMIT = int(os.environ.get('TRACKER_LIMIT', DETECTOR_POOL_SIZE))
+
+# Stages timed here, detect and classify are timed by the classifier (see metrics.py)
+BASE64_SECONDS = STAGE_SECONDS.labels('base64')
+DECODE_SECONDS = STAGE_SECONDS.labels('decode')
+BACKEND_SECONDS = STAGE_SECONDS.labels('process_backend')
+SERIALIZE_SECONDS = STAGE_SECONDS.labels('serialize')
+STREAM_MESSAGE_SECONDS = REQUEST_SECONDS.labels('/ws/predict')
+OPEN_STREAMS = STREAM_SESSIONS.labels()
+STARTUP_SECONDS = REGISTRY.gauge(
+    'tabsirah_startup_seconds', 'Seconds spent loading the app (once, in the master) and warming up this worker',
+    ('phase',))
+# Export error counters at 0 before the first error, so rate() works from the start
+for endpoint in ('/predict', '/predict_landmarks', '/ws/predict'):
+    REQUEST_ERRORS.labels(endpoint)
+for reason in ('base64', 'image'):
+    DECODE_FAILURES.labels(reason)
 
 # Initialize classifier
 try:
-    classifier = SignLanguageClassifier()
-    print("Model loaded successfully.")
+    classifier = SignLanguageClassifier(batch_max_size=BATCH_MAX_SIZE,
+                                        batch_max_wait_ms=BATCH_MAX_WAIT_MS,
+                                        cache_max_entries=CACHE_MAX_ENTRIES,
+                                        cache_ttl_seconds=CACHE_TTL_SECONDS,
+                                        cache_quantum=CACHE_QUANTUM,
+                                        detector_pool_size=DETECTOR_POOL_SIZE,
+                                        model_check_interval=MODEL_CHECK_INTERVAL)
+    print(f"Model loaded successfully (version {classifier.registry.active.version}).")
 except Exception as e:
     print(f"Error loading model: {e}")
     classifier = None
 
+# Reference sign images, indexed in memory at startup
+sign_store = SignImageStore(os.path.join(app.static_folder, 'signs'))
+
+# Sign sequences of every surah verse, compiled once (see verse_plans.py)
+verse_planner = VersePlanner(SURAHS, sign_store, classifier.class_labels if classifier else ())
+verse_planner.prebuild()
+if classifier:
+    classifier.registry.on_swap(lambda version: verse_planner.set_labels(version.class_labels))
+
+# One slot per stream holding a tracker, taken without blocking by /ws/predict
+tracker_slots = threading.BoundedSemaphore(max(1, TRACKER_LIMIT))
+
+# Pacing hint sent with every prediction (see load_control.py)
+load_controller = LoadController(DETECTOR_POOL_SIZE, LOAD_TARGET_LATENCY_MS, max_dim=MAX_FRAME_DIM or 640)
+
+# Optional: run frame detection in a pool of worker processes (gthread worker class only)
+# INFERENCE_BACKEND=process, INFERENCE_PROCESSES=<n>
+inference_backend = None
+if classifier and os.environ.get('INFERENCE_BACKEND', 'inprocess') == 'process':
+    # Imported only when enabled (multiprocessing, shared memory)
+    from process_backend import ProcessInferenceBackend
+    inference_backend = ProcessInferenceBackend(int(os.environ.get('INFERENCE_PROCESSES', os.cpu_count() or 1)))
+
+# With preload_app everything above runs once in the gunicorn master and is shared
+# copy-on-write by the workers; what can't cross a fork is built by warm_up()
+STARTUP_SECONDS.labels('load').set(time.perf_counter() - LOAD_START)
+print(f"App loaded in {time.perf_counter() - LOAD_START:.2f}s")
+
+def warm_up():
+    """
+    Per-worker startup, called by gunicorn's post_worker_init hook before the
+    worker accepts connections: builds the HandLandmarkers and the batcher
+    thread and runs one inference, so no request pays for a cold worker
+    """
+    start = time.perf_counter()
+    try:
+        if classifier:
+            classifier.warm_up()
+        if inference_backend:
+            inference_backend.start()
+    except Exception as e:
+        print(f"Warm-up failed, continuing cold: {e}")
+    elapsed = time.perf_counter() - start
+    STARTUP_SECONDS.labels('warm_up').set(elapsed)
+    print(f"Worker {os.getpid()} warmed up in {elapsed:.2f}s")
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -56,75 +169,343 @@ def get_surah_route(surah_id):
         print(f"Error fetching surah {surah_id}: {e}")
         return jsonify({'error': str(e)}), 500
 
-def normalize_char_for_image(char):
+@app.route('/batch_stats')
+def batch_stats():
     """
-    Normalize Arabic character for image lookup
-    Converts all forms of a letter to its base form
+    Micro-batching counters: number of flushes, rows and batch-size distribution
     """
-    if not char:
-        return char
-    
-    # تطبيع الألف: أ، إ، آ، ء → ا
-    char = char.replace('أ', 'ا').replace('إ', 'ا').replace('آ', 'ا').replace('ء', 'ا').replace('ٱ', 'ا')
-    
-    # تطبيع الياء: ى، ئ → ي
-    char = char.replace('ى', 'ي').replace('ئ', 'ي')
-    
-    # تطبيع التاء المربوطة: ة → ه
-    char = char.replace('ة', 'ه')
-    
-    # إزالة التشكيل
-    import re
-    char = re.sub(r'[\u064B-\u065F\u0670]', '', char)
-    
-    return char
+    if not classifier or not classifier.batcher:
+        return jsonify({'enabled': False})
+    return jsonify(dict(classifier.batcher.stats(), enabled=True))
+
+@app.route('/cache_stats')
+def cache_stats():
+    """
+    Prediction cache counters: entries, hits, misses, evictions and expirations
+    """
+    if not classifier or not classifier.cache:
+        return jsonify({'enabled': False})
+    return jsonify(dict(classifier.cache.stats(), enabled=True))
+
+def component_metrics():
+    """
+    Load, model, batcher, cache and detector pool counters for /metrics, read at scrape time
+    """
+    families = [
+        ('tabsirah_load_pressure', 'gauge', 'Smoothed in-flight requests or latency relative to capacity (1 = saturated)',
+         [({}, load_controller.pressure())]),
+        ('tabsirah_requests_in_flight', 'gauge', 'Prediction requests being handled', [({}, load_controller.in_flight)]),
+    ]
+    if not classifier:
+        return families
+    models = classifier.registry.stats()
+    families += [
+        ('tabsirah_model_info', 'gauge', 'Model version serving new requests',
+         [({'version': models['version']}, 1)]),
+        ('tabsirah_model_swaps_total', 'counter', 'Model versions swapped in without a restart',
+         [({}, models['swaps'])]),
+        ('tabsirah_model_reload_failures_total', 'counter', 'Manifest changes whose model failed to load',
+         [({}, models['failed_reloads'])]),
+        ('tabsirah_models_draining', 'gauge', 'Replaced model versions still finishing in-flight requests',
+         [({}, len(models['draining']))]),
+    ]
+    pool = classifier.detectors.stats()
+    families += [
+        ('tabsirah_detectors', 'gauge', 'HandLandmarker instances created in this worker',
+         [({}, pool['created'])]),
+        ('tabsirah_detector_checkouts_total', 'counter', 'Detector checkouts', [({}, pool['checkouts'])]),
+        ('tabsirah_detector_waits_total', 'counter', 'Checkouts that waited for a busy pool',
+         [({}, pool['waits'])]),
+    ]
+    if classifier.batcher:
+        batches = classifier.batcher.stats()
+        families += [
+            ('tabsirah_batch_flushes_total', 'counter', 'Micro-batcher model calls, by batch size',
+             [({'size': size}, count) for size, count in batches['batch_size_histogram'].items()]),
+            ('tabsirah_batch_rows_total', 'counter', 'Rows classified by the micro-batcher',
+             [({}, batches['rows'])]),
+        ]
+    if classifier.cache:
+        cache = classifier.cache.stats()
+        families += [
+            ('tabsirah_cache_entries', 'gauge', 'Prediction cache entries', [({}, cache['entries'])]),
+            ('tabsirah_cache_lookups_total', 'counter', 'Prediction cache lookups, by result',
+             [({'result': 'hit'}, cache['hits']), ({'result': 'miss'}, cache['misses'])]),
+            ('tabsirah_cache_removals_total', 'counter', 'Prediction cache entries removed, by reason',
+             [({'reason': 'evicted'}, cache['evictions']), ({'reason': 'expired'}, cache['expirations'])]),
+        ]
+    return families
+
+REGISTRY.add_collector(component_metrics)
+
+@app.route('/metrics')
+def metrics():
+    """
+    Prometheus scrape endpoint: stage latency histograms, frame/error counters
+    and the batcher, cache and detector pool counters of this worker
+    """
+    return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 @app.route('/sign_image/<path:char>')
 def get_sign_image(char):
     """
     Dynamic Image Selector:
-    Finds all images starting with `char` in static/signs/
-    Sorts them and returns the LAST one.
-    Useful for versioning: 'Aleff.jpg', 'Aleff_v2.jpg' -> serves 'Aleff_v2.jpg'
+    Serves the chosen version of a letter's reference image from the in-memory index
+    ('Aleff.jpg', 'Aleff_v2.jpg' -> serves 'Aleff_v2.jpg').
+    Responses carry an ETag and Last-Modified so repeat hits are 304s; URLs pinned
+    to a version with ?v=<etag> are cached as immutable.
+    """
+    # Flask already URL-decodes the path
+    image = sign_store.get(char)
+    if image is None:
+        return abort(404)
+
+    response = Response(image.data, mimetype='image/jpeg')
+    response.set_etag(image.etag)
+    response.last_modified = image.last_modified
+    if request.args.get('v') == image.etag:
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def admin_authorized():
+    """
+    Admin endpoints require ADMIN_TOKEN in the X-Admin-Token header
+    They are disabled when ADMIN_TOKEN isn't set
     """
+    token = os.environ.get('ADMIN_TOKEN')
+    return bool(token) and request.headers.get('X-Admin-Token') == token
+
+@app.route('/admin/reload_signs', methods=['POST'])
+def reload_signs():
+    """
+    Rebuild the sign image index after new versions were copied into static/signs
+    """
+    if not admin_authorized():
+        return jsonify({'error': 'Forbidden'}), 403
+    return jsonify({'letters': sign_store.reload()})
+
+@app.route('/admin/reload_model', methods=['POST'])
+def reload_model():
+    """
+    Swap in the manifest's active model now, or roll to another published
+    version with {"version": "..."}. Requests already running finish on the old
+    model; the other workers follow within MODEL_CHECK_INTERVAL seconds
+    """
+    if not admin_authorized():
+        return jsonify({'error': 'Forbidden'}), 403
+    if not classifier:
+        return jsonify({'error': 'Model not loaded'}), 503
+
+    payload = request.get_json(silent=True) or {}
+    previous = classifier.registry.active.version
     try:
-        # Base directory
-        static_folder = os.path.join(app.static_folder, 'signs')
-        
-        # Decode URL-encoded character if needed
-        from urllib.parse import unquote
-        char = unquote(char)
-        
-        # Normalize the character (أ، إ، آ → ا)
-        normalized_char = normalize_char_for_image(char)
-        
-        # PRIORITY 1: Try exact match with normalized character
-        exact_path = os.path.join(static_folder, f"{normalized_char}.jpg")
-        if os.path.exists(exact_path):
-            return send_file(exact_path, mimetype='image/jpeg')
-        
-        # PRIORITY 2: Search pattern for versioned files (char + suffix + extension)
-        pattern = os.path.join(static_folder, f"{normalized_char}*.jpg")
-        matches = glob.glob(pattern)
-        
-        if not matches:
-            return abort(404)
-            
-        # Sort matches and select last one (for versioning support)
-        matches.sort()
-        last_image = matches[-1]
-        
-        return send_file(last_image, mimetype='image/jpeg')
-        
+        version = classifier.registry.reload(payload.get('version'))
+    except KeyError:
+        return jsonify({'error': f"Unknown model version {payload.get('version')}"}), 404
     except Exception as e:
+        print(f"Error reloading model: {e}")
+        return jsonify({'error': str(e), 'version': previous}), 500
+    return jsonify({'version': version, 'previous': previous, 'swapped': version != previous})
+
+def plan_response(payload):
+    """
+    JSON response revalidated by ETag, plans change only when sign images do
+    """
+    response = jsonify(payload)
+    response.add_etag()
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@app.route('/verse_plans/<surah_id>')
+def get_verse_plans(surah_id):
+    """
+    Render plans of every verse of a surah in one request:
+    sign steps per word, accepted labels, image URLs and a sprite sheet
+    """
+    surah = get_surah(surah_id)
+    if not surah:
+        return jsonify({'error': 'Surah not found'}), 404
+    if not is_surah_unlocked(surah_id):
+        return jsonify({'error': 'Surah is locked'}), 403
+
+    return plan_response({
+        'surah_id': surah_id,
+        'verses': [verse_planner.plan(verse) for verse in surah['verses']],
+    })
+
+@app.route('/verse_plan')
+def get_verse_plan():
+    """
+    Render plan of any practice text (?text=...), free practice and retried verses
+    """
+    text = request.args.get('text', '').strip()
+    if not text:
+        return jsonify({'error': 'No text provided'}), 400
+    return plan_response(verse_planner.plan(text))
+
+@app.route('/sign_sprite')
+def get_sign_sprite():
+    """
+    Sprite sheet of the sign images listed in ?letters=ا,ل,ك (one square cell each)
+    Cached as immutable when ?v= matches the current images
+    Returns 400 if more letters are listed than there are sign images
+    """
+    letters = [letter for letter in request.args.get('letters', '').split(',') if letter]
+    if len(letters) > len(sign_store.letters()):
+        return jsonify({'error': 'Too many letters'}), 400
+    sprite = verse_planner.sprite(letters)
+    if sprite is None:
         return abort(404)
 
+    data, version = sprite
+    response = Response(data, mimetype='image/jpeg')
+    response.set_etag(version)
+    response.cache_control.public = True
+    if request.args.get('v') == version:
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def decode_data_url(data):
+    """
+    Decode a base64 image, optionally wrapped in a data URL
+    Data URL format: "data:image/jpeg;base64,/9j/4AAQ..."
+    Returns None if the payload is not valid base64
+    """
+    if "," in data:
+        header, encoded = data.split(",", 1)
+    else:
+        encoded = data
+
+    try:
+        with BASE64_SECONDS.time():
+            return base64.b64decode(encoded)
+    except (binascii.Error, ValueError):
+        DECODE_FAILURES.labels('base64').inc()
+        return None
+
+def detection_landmarks(detection_result):
+    """(N, 21, 2) landmarks of every detected hand, encoded by response_encoding"""
+    if not detection_result or not detection_result.hand_landmarks:
+        return hands_array([])
+    return hands_array([landmarks_to_array(hand) for hand in detection_result.hand_landmarks])
+
+def recognize(recognizer, points):
+    """
+    Feed one hand to a per-session recognizer
+    Returns the fields added to streaming responses
+    """
+    result = recognizer.update(build_features(landmarks_to_array(points)))
+    return {
+        'prediction': result['label'],
+        'raw_prediction': result['raw'],
+        'confidence': result['confidence'],
+        'raw_confidence': result['raw_confidence'],
+        'stable': result['label'] is not None,
+    }
+
+def predict_image_bytes(binary, recognizer=None, tracker=None):
+    """
+    Decode an encoded frame, detect the hand and classify it
+    With a session `recognizer` the letter is temporally smoothed, with a
+    session `tracker` the hand is searched around where it was in the last frame
+    Returns the /predict response body
+    """
+    with DECODE_SECONDS.time():
+        frame_rgb = decode_frame(binary, MAX_FRAME_DIM)
+    if frame_rgb is None:
+        DECODE_FAILURES.labels('image').inc()
+        return {'error': 'Failed to decode image', 'prediction': None, 'landmarks': []}
+
+    if recognizer is None and inference_backend is not None:
+        with BACKEND_SECONDS.time():
+            detail, hands = inference_backend.predict(frame_rgb, top_k=PREDICTION_TOP_K)
+        FRAMES.labels('yes' if hands else 'no').inc()
+        response = detail or {'prediction': None}
+        response['landmarks'] = hands_array(hands)
+        return response
+
+    if tracker is not None:
+        hand = tracker.detect(frame_rgb)
+        FRAMES.labels('yes' if hand is not None else 'no').inc()
+        if hand is None:
+            recognizer.reset()
+            return {'prediction': None, 'landmarks': []}
+        response = recognize(recognizer, hand)
+        response['landmarks'] = hand[np.newaxis]
+        return response
+
+    if recognizer is None:
+        detail, detection_result = classifier.predict_frame_detailed(frame_rgb, PREDICTION_TOP_K)
+        response = detail or {'prediction': None}
+    else:
+        detection_result = classifier.detect(frame_rgb)
+        if detection_result.hand_landmarks:
+            response = recognize(recognizer, detection_result.hand_landmarks[0])
+        else:
+            recognizer.reset()
+            response = {'prediction': None}
+
+    response['landmarks'] = detection_landmarks(detection_result)
+    return response
+
+def with_hint(response):
+    """Add the client pacing hint (send interval, frame size, JPEG quality) to a prediction"""
+    response['hint'] = load_controller.hint()
+    return response
+
+def prediction_response(response):
+    """
+    A prediction with its pacing hint, in the format negotiated with the Accept
+    header (see response_encoding.py). Errors are always plain JSON
+    """
+    with_hint(response)
+    media_type = JSON
+    if 'error' not in response:
+        media_type = request.accept_mimetypes.best_match(MEDIA_TYPES, default=JSON)
+    with SERIALIZE_SECONDS.time():
+        body = encode_response(response, media_type)
+    http_response = Response(body, mimetype=media_type)
+    http_response.vary.add('Accept')
+    return http_response
+
 @app.route('/predict', methods=['POST'])
+@timed(REQUEST_SECONDS.labels('/predict'))
+@load_controller.tracked
 def predict():
+    """
+    Predict from one frame, sent as either:
+    - a raw image/jpeg, image/webp or image/png body (no base64 overhead)
+    - multipart/form-data with the frame in an `image` file field
+    - JSON {"image": "data:image/jpeg;base64,..."}
+    Predictions carry a `hint` the client paces its frames by. The response is JSON
+    unless the Accept header asks for a compact format (see response_encoding.py)
+    """
     if not classifier:
         return jsonify({'error': 'Model not loaded', 'prediction': None, 'landmarks': []}), 200
     
     try:
+        if request.mimetype in FRAME_MIMETYPES:
+            # Read the body once, uncached, and decode it in place
+            binary = request.get_data(cache=False)
+            if not binary:
+                return jsonify({'error': 'No image data', 'prediction': None, 'landmarks': []}), 200
+            return prediction_response(predict_image_bytes(binary))
+
+        if request.mimetype == 'multipart/form-data':
+            upload = request.files.get('image')
+            if upload is None:
+                return jsonify({'error': 'No image data', 'prediction': None, 'landmarks': []}), 200
+            return prediction_response(predict_image_bytes(upload.read()))
+
         # Check if request has JSON
         if not request.is_json:
             return jsonify({'error': 'No JSON data', 'prediction': None, 'landmarks': []}), 200
@@ -133,49 +514,153 @@ def predict():
         if not json_data or 'image' not in json_data:
             return jsonify({'error': 'No image data', 'prediction': None, 'landmarks': []}), 200
             
-        data = json_data['image']
-        
-        # Decode base64
-        # Data URL format: "data:image/jpeg;base64,/9j/4AAQ..."
-        if "," in data:
-            header, encoded = data.split(",", 1)
-        else:
-            encoded = data
-        
-        try:
-            binary = base64.b64decode(encoded)
-        except Exception:
+        binary = decode_data_url(json_data['image'])
+        if binary is None:
             return jsonify({'error': 'Invalid base64', 'prediction': None, 'landmarks': []}), 200
             
-        image_array = np.frombuffer(binary, dtype=np.uint8)
-        frame = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
-        
-        if frame is None:
-            return jsonify({'error': 'Failed to decode image', 'prediction': None, 'landmarks': []}), 200
-
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        label, detection_result = classifier.predict(frame_rgb)
-        
-        # Serialize landmarks
-        landmarks_data = []
-        if detection_result and detection_result.hand_landmarks:
-            for hand_landmarks in detection_result.hand_landmarks:
-                hand_points = []
-                for landmark in hand_landmarks:
-                    hand_points.append({'x': landmark.x, 'y': landmark.y})
-                landmarks_data.append(hand_points)
-
-        # Ensure label is properly encoded (None becomes null in JSON)
-        response_data = {
-            'prediction': label if label is not None else None,
-            'landmarks': landmarks_data
-        }
-        
-        return jsonify(response_data)
+        return prediction_response(predict_image_bytes(binary))
     except Exception as e:
         # Return valid JSON even on error
+        REQUEST_ERRORS.labels('/predict').inc()
         return jsonify({'error': str(e), 'prediction': None, 'landmarks': []}), 200
 
+NUM_HAND_LANDMARKS = 21
+# Normalized coordinates a real hand can have, a hand partly out of frame goes a little past 0 and 1
+LANDMARK_MIN, LANDMARK_MAX = -1.0, 2.0
+
+def parse_landmarks(raw):
+    """
+    Validate landmarks sent by the browser's HandLandmarker
+    Accepts [{'x': .., 'y': ..}, ...] or [[x, y], ...] and returns a list of (x, y) floats,
+    or None if the payload is not exactly 21 finite points within LANDMARK_MIN..LANDMARK_MAX
+    """
+    if not isinstance(raw, list) or len(raw) != NUM_HAND_LANDMARKS:
+        return None
+
+    points = []
+    for point in raw:
+        try:
+            if isinstance(point, dict):
+                x, y = float(point['x']), float(point['y'])
+            else:
+                x, y = float(point[0]), float(point[1])
+        except (KeyError, IndexError, TypeError, ValueError):
+            return None
+        if not (LANDMARK_MIN <= x <= LANDMARK_MAX and LANDMARK_MIN <= y <= LANDMARK_MAX):
+            return None  # Also rejects NaN and infinities
+        points.append((x, y))
+    return points
+
+def predict_landmarks_payload(raw, recognizer=None):
+    """
+    Classify landmarks sent by the browser
+    With a session `recognizer` the letter is temporally smoothed
+    Returns the /predict_landmarks response body
+    """
+    points = parse_landmarks(raw)
+    if points is None:
+        return {'error': 'Invalid landmarks', 'prediction': None}
+
+    if recognizer is not None:
+        return recognize(recognizer, points)
+    return classifier.predict_detailed(points, PREDICTION_TOP_K)
+
+@app.route('/predict_landmarks', methods=['POST'])
+@timed(REQUEST_SECONDS.labels('/predict_landmarks'))
+@load_controller.tracked
+def predict_landmarks():
+    """
+    Landmark-only prediction
+    The browser already runs MediaPipe on every frame, so it sends the 21 normalized
+    landmarks of the first hand instead of a JPEG: no base64/imdecode/detect on the server
+    """
+    if not classifier:
+        return jsonify({'error': 'Model not loaded', 'prediction': None}), 200
+
+    try:
+        json_data = request.get_json(silent=True)
+        if not json_data or 'landmarks' not in json_data:
+            return jsonify({'error': 'No landmarks data', 'prediction': None}), 200
+
+        return prediction_response(predict_landmarks_payload(json_data['landmarks']))
+    except Exception as e:
+        REQUEST_ERRORS.labels('/predict_landmarks').inc()
+        return jsonify({'error': str(e), 'prediction': None}), 200
+
+@sock.route('/ws/predict')
+def predict_stream(ws):
+    """
+    Streaming prediction over a persistent WebSocket
+    The client sends JSON text messages {"seq": n, "landmarks": [...]} or {"seq": n, "image": "data:..."},
+    or binary messages holding an encoded frame. Each reply echoes `seq`.
+    Messages may carry an `episode` counter, bumped by the client whenever the hand leaves the frame.
+    Frames that queued up while the previous one was being classified are dropped,
+    only the most recent one is answered.
+    Letters are smoothed per session: `prediction` is only set once the recognizer
+    is confident (`stable`), `raw_prediction` is the single-frame result.
+    Image frames are tracked: the hand is searched near where it was in the previous frame
+    (for up to TRACKER_LIMIT streams at once, the others are detected on the full frame).
+    Every reply carries the pacing `hint` of /predict.
+    Connect with ?format=flat|packed|msgpack for the compact formats of /predict
+    (binary ones are sent as binary messages)
+    """
+    tracked = bool(classifier and ROI_TRACKING and TRACKER_LIMIT > 0 and tracker_slots.acquire(blocking=False))
+    session = StreamSession(SequenceRecognizer(classifier) if classifier else None,
+                            classifier.create_tracker() if tracked else None,
+                            FORMATS.get(request.args.get('format'), JSON))
+    OPEN_STREAMS.inc()
+    try:
+        serve_stream(ws, session)
+    finally:
+        session.close()
+        if tracked:
+            tracker_slots.release()
+        OPEN_STREAMS.dec()
+
+def serve_stream(ws, session):
+    """Answer one connection's messages until the client goes away"""
+    recognizer = session.recognizer
+    tracker = session.tracker
+    while True:
+        message = session.next_message(ws)
+        if message is None:
+            break
+
+        start = time.perf_counter()
+        seq = None
+        with load_controller.track():
+            try:
+                if not classifier:
+                    response = {'error': 'Model not loaded', 'prediction': None}
+                elif isinstance(message, bytes):
+                    response = predict_image_bytes(message, recognizer, tracker)
+                else:
+                    payload = json.loads(message)
+                    seq = payload.get('seq')
+                    # A new episode means the hand left the frame on the client
+                    if recognizer and payload.get('episode') != session.episode:
+                        recognizer.reset()
+                        session.episode = payload.get('episode')
+                    if 'landmarks' in payload:
+                        response = predict_landmarks_payload(payload['landmarks'], recognizer)
+                    elif 'image' in payload:
+                        binary = decode_data_url(payload['image'])
+                        if binary is None:
+                            response = {'error': 'Invalid base64', 'prediction': None, 'landmarks': []}
+                        else:
+                            response = predict_image_bytes(binary, recognizer, tracker)
+                    else:
+                        response = {'error': 'No landmarks or image data', 'prediction': None}
+            except Exception as e:
+                REQUEST_ERRORS.labels('/ws/predict').inc()
+                response = {'error': str(e), 'prediction': None}
+        STREAM_MESSAGE_SECONDS.observe(time.perf_counter() - start)
+
+        response['seq'] = seq
+        response['dropped'] = session.frames_dropped
+        with_hint(response)
+        if not session.send(ws, response):
+            break
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+Arabic letter normalization shared by the sign-image lookup and verse plans
+"""
+import re
+
+# إزالة التشكيل
+_DIACRITICS = re.compile(r'[\u064B-\u065F\u0670]')
+
+# تطبيع الألف، الياء والتاء المربوطة
+_LETTER_FORMS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ء': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي',
+    'ة': 'ه',
+})
+
+
+def normalize_char_for_image(char):
+    """
+    Normalize Arabic character for image lookup
+    Converts all forms of a letter to its base form
+    """
+    if not char:
+        return char
+    return _DIACRITICS.sub('', char.translate(_LETTER_FORMS))
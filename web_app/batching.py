@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Groups concurrent single-row predictions into one 2-D NumPy batch.
+    A background thread flushes the queue as soon as `max_batch_size` rows are
+    waiting or the oldest row has waited `max_wait_ms`, calls `predict_fn` once
+    on the stacked rows and hands every caller its own result back.
+    A row queued alone is flushed at once: rows pile up while the previous batch
+    runs, so a quiet server gains nothing from waiting.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=16, max_wait_ms=2.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._start_lock = threading.Lock()
+        self._cond = None
+        self._pending = []  # [(row, future, enqueued_at)]
+        self._pid = None
+        self._closed = False
+
+        # Counters (batch size -> number of flushes of that size)
+        self.batch_sizes = Counter()
+        self.total_rows = 0
+        self.total_batches = 0
+
+    def predict(self, row):
+        """Blocking helper: queue one feature row and wait for its result"""
+        return self.submit(row).result()
+
+    def start(self):
+        """Start this process' flush thread now instead of on the first prediction"""
+        if self._pid != os.getpid():
+            self._start()
+
+    def submit(self, row):
+        future = Future()
+        if self._pid != os.getpid():
+            self._start()
+        with self._cond:
+            self._pending.append((row, future, time.monotonic()))
+            self._cond.notify()
+        return future
+
+    def close(self):
+        """Stop this process' flush thread once the queued rows are answered"""
+        if self._pid != os.getpid():
+            return
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def stats(self):
+        histogram = dict(sorted(self.batch_sizes.copy().items()))
+        batches = self.total_batches
+        rows = self.total_rows
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'batches': batches,
+            'rows': rows,
+            'mean_batch_size': (rows / batches) if batches else 0.0,
+            'batch_size_histogram': histogram,
+        }
+
+    def _start(self):
+        # Started lazily (and again after fork): with preload_app the classifier is
+        # built in the gunicorn master, threads don't survive fork, and under the
+        # gevent worker the condition must be created after monkey-patching.
+        # The thread is started outside _start_lock (see gunicorn.conf.py)
+        with self._start_lock:
+            pid = os.getpid()
+            if self._pid == pid:
+                return
+            self._cond = threading.Condition()
+            self._pending = []
+            self._closed = False
+            self._pid = pid
+        threading.Thread(target=self._run, name='micro-batcher', daemon=True).start()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending:
+                if self._closed:
+                    return None
+                self._cond.wait()
+
+            deadline = self._pending[0][2] + self.max_wait
+            while 1 < len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+
+            self.batch_sizes[len(batch)] += 1
+            self.total_batches += 1
+            self.total_rows += len(batch)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            futures = [future for _, future, _ in batch]
+            try:
+                results = self.predict_fn(np.stack([row for row, _, _ in batch]))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            for future, result in zip(futures, results):
+                future.set_result(result)
@@ -0,0 +1,63 @@
+"""
+Per-letter probability calibration
+A random forest's predict_proba is the fraction of trees voting for a class,
+which is not the chance that the letter is right: some letters are
+over-confident, others under-confident. Each class gets a Platt scaling
+(a sigmoid of its raw probability) fit offline on held-out samples by
+src/4_train_model.py and stored with the model version in the registry
+manifest. At serving time the whole (N, classes) matrix is calibrated and
+renormalized in a few NumPy operations.
+"""
+import numpy as np
+
+
+class Calibration:
+    def __init__(self, slopes, intercepts):
+        # One (slope, intercept) per predict_proba column
+        self.slopes = np.asarray(slopes, dtype=np.float64)
+        self.intercepts = np.asarray(intercepts, dtype=np.float64)
+
+    @classmethod
+    def fit(cls, proba, y_index):
+        """
+        Fit on held-out raw probabilities (N, classes) and the column index of each true class
+        Classes missing from the held-out set keep a near-zero probability
+        """
+        from sklearn.linear_model import LogisticRegression
+
+        slopes = np.zeros(proba.shape[1])
+        intercepts = np.full(proba.shape[1], -10.0)
+        for column in range(proba.shape[1]):
+            target = (y_index == column)
+            if target.all() or not target.any():
+                continue
+            platt = LogisticRegression(C=1e4).fit(proba[:, column:column + 1], target)
+            slopes[column] = platt.coef_[0, 0]
+            intercepts[column] = platt.intercept_[0]
+        return cls(slopes, intercepts)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['slopes'], data['intercepts'])
+
+    def to_dict(self):
+        return {'slopes': self.slopes.tolist(), 'intercepts': self.intercepts.tolist()}
+
+    def apply(self, proba):
+        """Calibrated probabilities of a (N, classes) or (classes,) predict_proba output, rows sum to 1"""
+        calibrated = 1.0 / (1.0 + np.exp(-(proba * self.slopes + self.intercepts)))
+        return calibrated / calibrated.sum(axis=-1, keepdims=True)
+
+
+def expected_calibration_error(proba, y_index, bins=10):
+    """Mean |confidence - accuracy| of the top class over `bins` confidence bins, weighted by size"""
+    confidence = proba.max(axis=1)
+    correct = proba.argmax(axis=1) == y_index
+    edges = np.linspace(0.0, 1.0, bins + 1)
+    which = np.clip(np.digitize(confidence, edges[1:-1]), 0, bins - 1)
+    error = 0.0
+    for b in range(bins):
+        mask = which == b
+        if mask.any():
+            error += mask.mean() * abs(confidence[mask].mean() - correct[mask].mean())
+    return float(error)
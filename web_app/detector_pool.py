@@ -0,0 +1,99 @@
+import os
+import threading
+from contextlib import contextmanager
+
+
+class DetectorPool:
+    """
+    Pool of MediaPipe HandLandmarker instances, one checked out per request
+    A detector isn't safe to share between threads, so each thread borrows its
+    own. Instances are created lazily by `factory` (at most `size` of them) and
+    reused across requests; when all are busy callers wait for one to return.
+    """
+
+    def __init__(self, factory, size=2):
+        self.factory = factory
+        self.size = max(1, int(size))
+
+        self._start_lock = threading.Lock()
+        self._cond = None
+        self._idle = []
+        self._created = 0
+        self._pid = None
+
+        # Counters
+        self.checkouts = 0
+        self.waits = 0
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        detector = self._acquire(timeout)
+        try:
+            yield detector
+        finally:
+            self._release(detector)
+
+    def warm_up(self, fn):
+        """
+        Create all `size` detectors now and call `fn` on each, so a fresh worker
+        doesn't build them (and initialize their graphs) while serving requests
+        """
+        detectors = []
+        try:
+            while len(detectors) < self.size:
+                detectors.append(self._acquire(None))
+            for detector in detectors:
+                fn(detector)
+        finally:
+            for detector in detectors:
+                self._release(detector)
+
+    def stats(self):
+        return {
+            'size': self.size,
+            'created': self._created,
+            'idle': len(self._idle),
+            'checkouts': self.checkouts,
+            'waits': self.waits,
+        }
+
+    def _start(self):
+        # Detectors and their graph threads don't survive fork, a forked worker
+        # builds its own instead of touching the parent's
+        with self._start_lock:
+            pid = os.getpid()
+            if self._pid == pid:
+                return
+            self._cond = threading.Condition()
+            self._idle = []
+            self._created = 0
+            self._pid = pid
+
+    def _acquire(self, timeout):
+        if self._pid != os.getpid():
+            self._start()
+
+        with self._cond:
+            self.checkouts += 1
+            while not self._idle and self._created >= self.size:
+                self.waits += 1
+                if not self._cond.wait(timeout):
+                    raise TimeoutError("No hand detector available")
+
+            if self._idle:
+                # LIFO keeps the most recently used (warm) instance busy
+                return self._idle.pop()
+            self._created += 1
+
+        try:
+            return self.factory()
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, detector):
+        with self._cond:
+            self._idle.append(detector)
+            self._cond.notify()
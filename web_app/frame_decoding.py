@@ -0,0 +1,73 @@
+"""
+Frame decoding for /predict
+Encoded bytes go straight from the request body into cv2.imdecode (no base64,
+no copies), and large JPEGs are decoded at 1/2, 1/4 or 1/8 scale by libjpeg
+itself when the detector doesn't need the full resolution. Landmarks are
+normalized to the frame size, so downscaling doesn't change their meaning.
+"""
+import cv2
+import numpy as np
+
+# Content types accepted as a raw request body
+FRAME_MIMETYPES = ('image/jpeg', 'image/webp', 'image/png')
+
+# JPEG start-of-frame markers (baseline, progressive, ...) carry the image size
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+_REDUCED_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8),
+                  (4, cv2.IMREAD_REDUCED_COLOR_4),
+                  (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+
+def jpeg_dimensions(buf):
+    """
+    (width, height) read from a JPEG's SOF segment without decoding it
+    Returns None if `buf` isn't a JPEG or the header is truncated
+    """
+    if len(buf) < 4 or buf[0] != 0xFF or buf[1] != 0xD8:
+        return None
+
+    i = 2
+    while i + 9 < len(buf):
+        if buf[i] != 0xFF:
+            return None
+        marker = buf[i + 1]
+        if marker == 0xFF:  # Fill byte
+            i += 1
+            continue
+        if marker in _SOF_MARKERS:
+            height = (buf[i + 5] << 8) | buf[i + 6]
+            width = (buf[i + 7] << 8) | buf[i + 8]
+            return width, height
+        if marker == 0xDA:  # Start of scan, no SOF before the image data
+            return None
+        i += 2 + ((buf[i + 2] << 8) | buf[i + 3])
+    return None
+
+
+def decode_flag(binary, max_dim):
+    """
+    imdecode flag: the strongest JPEG reduction that keeps the longest
+    side >= max_dim, full-size colour decode otherwise
+    """
+    if max_dim:
+        size = jpeg_dimensions(binary)
+        if size:
+            longest = max(size)
+            for factor, flag in _REDUCED_FLAGS:
+                if longest // factor >= max_dim:
+                    return flag
+    return cv2.IMREAD_COLOR
+
+
+def decode_frame(binary, max_dim=0):
+    """
+    Decode an encoded frame (bytes-like) into an RGB array, None if it is not a valid image
+    """
+    image_array = np.frombuffer(binary, dtype=np.uint8)
+    if image_array.size == 0:
+        return None
+    frame = cv2.imdecode(image_array, decode_flag(binary, max_dim))
+    if frame is None:
+        return None
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
@@ -1,10 +1,28 @@
 # Gunicorn configuration for Railway
 # Optimized for Railway's resources
+import gc
+import os
 
 # Worker settings
 workers = 1
-worker_class = "sync"
-threads = 2
+# gthread: MediaPipe detection and model prediction are CPU-bound C calls that
+# run in parallel on OS threads (one HandLandmarker per thread, DETECTOR_POOL_SIZE).
+# Each open /ws/predict stream holds a thread, raise GUNICORN_THREADS for more learners.
+# GUNICORN_WORKER_CLASS=gevent is opt-in for many mostly idle streams per worker,
+# but those C calls never yield, so a worker then runs its frames one at a time.
+#
+# Under gevent, locks created while the master loads the app (preload_app) stay
+# real OS locks after the worker monkey-patches threading: the app never holds one
+# across anything that switches greenlets (I/O, sleeps, Thread.start), or the
+# greenlet waiting for it blocks the whole worker
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+# gevent only: connections per worker
+worker_connections = 200
+# The process backend waits on multiprocessing queues, which would block the gevent hub
+if os.environ.get("INFERENCE_BACKEND") == "process" and worker_class == "gevent":
+    raise RuntimeError("INFERENCE_BACKEND=process needs GUNICORN_WORKER_CLASS=gthread")
+# With gthread, the classifier keeps one HandLandmarker per thread (DETECTOR_POOL_SIZE)
+threads = int(os.environ.get("GUNICORN_THREADS", "2"))
 
 # Timeout
 timeout = 120
@@ -24,3 +42,18 @@ errorlog = "-"
 loglevel = "info"
 
 # Note: bind is set via command line --bind 0.0.0.0:$PORT in Procfile
+
+
+def pre_fork(server, worker):
+    # The model, sign images and verse plans loaded by the master live forever:
+    # frozen, the workers' garbage collector never writes to their pages, so
+    # they stay shared instead of being copied into every worker
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    # Runs in the new worker (after any gevent monkey-patching) before it accepts
+    # connections. max_requests recycles workers often, so the first request
+    # after a restart shouldn't be the one building the detectors
+    import app
+    app.warm_up()
@@ -0,0 +1,138 @@
+"""
+Per-session hand tracking for streamed frames
+A webcam stream shows the same hand in nearly the same place frame after
+frame, so instead of running the IMAGE-mode detector on the full frame each
+time, a session owns a VIDEO-mode HandLandmarker (which reuses the previous
+hand to skip palm detection) and feeds it only a padded region around the
+hand found in the previous frame. The region stays put while the hand moves
+inside it, so the landmarker's own tracking keeps working, and is re-centered
+when the hand nears its edge. When no hand is found in the region the same
+frame is retried on the full frame, so a lost hand costs one extra detection.
+Landmarks are returned in full-frame normalized coordinates, the ones the
+classifier was trained on.
+"""
+import time
+
+import mediapipe as mp
+import numpy as np
+
+from landmark_features import landmarks_to_array
+from metrics import REGISTRY, STAGE_SECONDS
+
+DETECT_SECONDS = STAGE_SECONDS.labels('detect')
+TRACKED_FRAMES = REGISTRY.counter(
+    'tabsirah_tracker_frames', 'Streamed frames detected by the hand tracker, by region searched', ('region',))
+ROI_FRAMES = TRACKED_FRAMES.labels('roi')
+FULL_FRAMES = TRACKED_FRAMES.labels('full')
+
+
+class HandTracker:
+    """
+    VIDEO-mode detection of one stream's frames, cropped to the hand's region
+    `factory` builds the session's HandLandmarker (RunningMode.VIDEO); it isn't
+    shared, timestamps of one landmarker must keep increasing
+    """
+
+    def __init__(self, factory, padding=2.0, min_size=96):
+        self.factory = factory
+        # Side of the square region, in multiples of the hand's bounding box
+        self.padding = padding
+        # Smallest region side in pixels, tiny regions lose the hand on any motion
+        self.min_size = min_size
+
+        self._detector = None
+        self._start = time.monotonic()
+        self._timestamp_ms = -1
+        self._roi = None  # (x0, y0, x1, y1) pixels of the region searched next
+        self._roi_shape = None  # Shape of the frame _roi was placed in
+
+    def detect(self, frame_rgb):
+        """(21, 2) full-frame normalized landmarks of the first hand, None if there is none"""
+        if self._detector is None:
+            self._detector = self.factory()
+
+        # Clients shrink their frames under load (the pacing hint's max_dim),
+        # a region placed in a frame of another size means nothing in this one
+        if self._roi is not None and self._roi_shape != frame_rgb.shape:
+            self._roi = None
+
+        if self._roi is not None:
+            try:
+                hand = self._detect_region(frame_rgb, self._roi)
+            except Exception:
+                # Never retried: a region the detector rejects would fail every later frame
+                self._roi = None
+                raise
+            ROI_FRAMES.inc()
+            if hand is not None:
+                self._follow(hand, frame_rgb.shape)
+                return hand
+
+        # No region yet, or the hand left it
+        height, width = frame_rgb.shape[:2]
+        hand = self._detect_region(frame_rgb, (0, 0, width, height))
+        FULL_FRAMES.inc()
+        self._roi = None
+        if hand is not None:
+            self._follow(hand, frame_rgb.shape)
+        return hand
+
+    def reset(self):
+        """Forget the hand's region, the next frame is searched in full"""
+        self._roi = None
+
+    def close(self):
+        if self._detector is not None:
+            self._detector.close()
+            self._detector = None
+
+    def _detect_region(self, frame_rgb, roi):
+        height, width = frame_rgb.shape[:2]
+        x0, y0, x1, y1 = roi
+        x0, x1 = max(0, x0), min(width, x1)
+        y0, y1 = max(0, y0), min(height, y1)
+        if x1 <= x0 or y1 <= y0:
+            return None  # Empty crop, the full frame is searched instead
+        crop = frame_rgb if (x1 - x0, y1 - y0) == (width, height) else np.ascontiguousarray(frame_rgb[y0:y1, x0:x1])
+
+        image = mp.Image(image_format=mp.ImageFormat.SRGB, data=crop)
+        with DETECT_SECONDS.time():
+            result = self._detector.detect_for_video(image, self._next_timestamp())
+        if not result.hand_landmarks:
+            return None
+
+        # Crop-normalized -> full-frame normalized
+        hand = landmarks_to_array(result.hand_landmarks[0])
+        hand *= (x1 - x0, y1 - y0)
+        hand += (x0, y0)
+        hand /= (width, height)
+        return hand
+
+    def _follow(self, hand, shape):
+        """Keep the region if the hand is still well inside it, otherwise center a new one on it"""
+        height, width = shape[:2]
+        left, top = hand.min(axis=0) * (width, height)
+        right, bottom = hand.max(axis=0) * (width, height)
+
+        if self._roi is not None:
+            x0, y0, x1, y1 = self._roi
+            margin = (x1 - x0) / (4 * self.padding)
+            fits = (left - x0 >= margin and x1 - right >= margin and
+                    top - y0 >= margin and y1 - bottom >= margin)
+            # A hand that moved away from the camera would be tiny in an old, large region
+            if fits and max(right - left, bottom - top) * self.padding * 2 > x1 - x0:
+                return
+
+        side = max(self.min_size, self.padding * max(right - left, bottom - top))
+        side = int(min(side, width, height))
+        cx, cy = (left + right) / 2, (top + bottom) / 2
+        x0 = int(np.clip(cx - side / 2, 0, width - side))
+        y0 = int(np.clip(cy - side / 2, 0, height - side))
+        self._roi = (x0, y0, x0 + side, y0 + side)
+        self._roi_shape = shape
+
+    def _next_timestamp(self):
+        # detect_for_video rejects a timestamp that isn't larger than the previous one,
+        # which happens when a region miss is retried on the full frame
+        self._timestamp_ms = max(self._timestamp_ms + 1, int((time.monotonic() - self._start) * 1000))
+        return self._timestamp_ms
@@ -1,102 +1,204 @@
-import pickle
-import cv2
 import mediapipe as mp
 import numpy as np
 import os
+import time
 from mediapipe.tasks import python
 from mediapipe.tasks.python import vision
+from detector_pool import DetectorPool
+from hand_tracker import HandTracker
+from prediction_cache import PredictionCache
+from landmark_features import NUM_FEATURES, build_features, landmarks_to_array
+from metrics import FRAMES, MODEL_ERRORS, STAGE_SECONDS
+from model_registry import ModelRegistry
+
+DETECT_SECONDS = STAGE_SECONDS.labels('detect')
+CLASSIFY_SECONDS = STAGE_SECONDS.labels('classify')
+FRAMES_WITH_HAND = FRAMES.labels('yes')
+FRAMES_NO_HAND = FRAMES.labels('no')
+MODEL_ERROR_COUNT = MODEL_ERRORS.labels()
 
 class SignLanguageClassifier:
-    def __init__(self):
+    def __init__(self, batch_max_size=1, batch_max_wait_ms=2.0,
+                 cache_max_entries=0, cache_ttl_seconds=300.0, cache_quantum=0.005,
+                 detector_pool_size=2, model_check_interval=5.0):
         # Paths relative to web_app/ folder
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # ArASL_Project root
-        model_path = os.path.join(base_dir, 'models', 'model_lightgbm.p')
         task_path = os.path.join(base_dir, 'models', 'hand_landmarker.task')
 
-        if not os.path.exists(model_path):
-             raise FileNotFoundError(f"Model file not found: {model_path}")
         if not os.path.exists(task_path):
              raise FileNotFoundError(f"Task file not found: {task_path}")
 
-        self.model_dict = pickle.load(open(model_path, 'rb'))
-        self.model = self.model_dict['model']
+        # Versioned models and their label maps (models/registry), hot-swapped on change.
+        # Each version has its own micro-batcher (batch_max_size=1 disables it)
+        self.registry = ModelRegistry(batch_max_size=batch_max_size, batch_max_wait_ms=batch_max_wait_ms,
+                                      check_interval=model_check_interval)
         
         base_options = python.BaseOptions(model_asset_path=task_path)
         options = vision.HandLandmarkerOptions(
             base_options=base_options,
             num_hands=1,
             min_hand_detection_confidence=0.3)
-        self.detector = vision.HandLandmarker.create_from_options(options)
         
-        # ARABIC LABELS MAP
-        self.labels_dict = {
-            0: 'ا', 
-            1: 'ب', 
-            2: 'ت', 
-            3: 'ث', 
-            4: 'ج', 
-            5: 'ح', 
-            6: 'خ', 
-            7: 'د', 
-            8: 'ذ', 
-            9: 'ر', 
-            10: 'ز', 
-            11: 'س', 
-            12: 'ش', 
-            13: 'ص', 
-            14: 'ض', 
-            15: 'ط', 
-            16: 'ظ', 
-            17: 'ع', 
-            18: 'غ', 
-            19: 'ف', 
-            20: 'ق', 
-            21: 'ك', 
-            22: 'ل', 
-            23: 'م', 
-            24: 'ن', 
-            25: 'ه', 
-            26: 'و', 
-            27: 'ي', 
-            28: 'ة', 
-            29: 'لا', 
-        }
+        # HandLandmarker isn't thread-safe: each request borrows its own instance
+        self.detectors = DetectorPool(
+            lambda: vision.HandLandmarker.create_from_options(options), detector_pool_size)
 
-    def predict(self, frame_rgb):
+        # Streams track the hand across frames with their own VIDEO-mode instance
+        self.video_options = vision.HandLandmarkerOptions(
+            base_options=base_options,
+            running_mode=vision.RunningMode.VIDEO,
+            num_hands=1,
+            min_hand_detection_confidence=0.3)
+
+        # Repeated hand poses skip the model entirely (cache_max_entries=0 disables it)
+        self.cache = None
+        if cache_max_entries > 0:
+            self.cache = PredictionCache(cache_max_entries, cache_ttl_seconds, cache_quantum)
+
+    @property
+    def model(self):
+        return self.registry.active.model
+
+    @property
+    def class_labels(self):
+        """Arabic label of each predict_proba column of the active model"""
+        return self.registry.active.class_labels
+
+    @property
+    def batcher(self):
+        return self.registry.active.batcher
+
+    def warm_up(self):
+        """
+        Build this process' detectors and batcher thread and run each once
+        The first detect() of a HandLandmarker initializes its graph, which
+        would otherwise land on the first request a new worker serves
+        """
+        # The master may still hold an older model than the manifest's active one
+        self.registry.maybe_reload()
+        blank = mp.Image(image_format=mp.ImageFormat.SRGB, data=np.zeros((256, 256, 3), dtype=np.uint8))
+        self.detectors.warm_up(lambda detector: detector.detect(blank))
+        with self.registry.lease() as version:
+            version.predict_proba(np.zeros((1, NUM_FEATURES), dtype=np.float32))
+            if version.batcher:
+                version.batcher.start()
+
+    def detect(self, frame_rgb):
         mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=frame_rgb)
-        detection_result = self.detector.detect(mp_image)
+        with self.detectors.checkout() as detector, DETECT_SECONDS.time():
+            detection_result = detector.detect(mp_image)
+        (FRAMES_WITH_HAND if detection_result.hand_landmarks else FRAMES_NO_HAND).inc()
+        return detection_result
+
+    def create_tracker(self):
+        """HandTracker for one stream session, close() it when the session ends"""
+        return HandTracker(lambda: vision.HandLandmarker.create_from_options(self.video_options))
+
+    def predict(self, frame_rgb):
+        detection_result = self.detect(frame_rgb)
         
         prediction_label = None
         
         if detection_result.hand_landmarks:
             # Take first hand
             hand_landmarks = detection_result.hand_landmarks[0]
-            
-            data_aux = []
-            x_ = []
-            y_ = []
-
-            for landmark in hand_landmarks:
-                x_.append(landmark.x)
-                y_.append(landmark.y)
-
-            for landmark in hand_landmarks:
-                data_aux.append(landmark.x - min(x_))
-                data_aux.append(landmark.y - min(y_))
-
-            try:
-                prediction = self.model.predict([np.asarray(data_aux)])
-                # Prediction is the Folder Name (e.g., '16')
-                label_key = prediction[0]
-                
-                # Force int conversion for lookup
-                try:
-                    key_int = int(label_key)
-                    prediction_label = self.labels_dict.get(key_int, label_key)
-                except:
-                    prediction_label = self.labels_dict.get(label_key, label_key)
-                    
-            except Exception as e:
-                pass
+            prediction_label = self.predict_landmarks(hand_landmarks)
                 
         return prediction_label, detection_result
+
+    def predict_frame_detailed(self, frame_rgb, top_k=3):
+        """
+        (predict_detailed of the first hand or None, detection_result) of one RGB frame,
+        timing_ms also holds the detection time
+        """
+        start = time.perf_counter()
+        detection_result = self.detect(frame_rgb)
+        if not detection_result.hand_landmarks:
+            return None, detection_result
+        detected = time.perf_counter()
+
+        detail = self.predict_detailed(detection_result.hand_landmarks[0], top_k)
+        detail['timing_ms']['detect'] = (detected - start) * 1000
+        return detail, detection_result
+
+    def predict_landmarks(self, points):
+        """
+        Classify a hand from its 21 landmarks without running the detector.
+        `points` is a sequence of MediaPipe landmarks or (x, y) pairs in normalized
+        image coordinates, exactly as produced by MediaPipe (server side or in the browser).
+        Model failures raise (and are counted in tabsirah_model_errors_total)
+        """
+        proba, class_labels = self.predict_proba_with_labels(build_features(landmarks_to_array(points)))
+        return class_labels[int(np.argmax(proba))]
+
+    def predict_detailed(self, points, top_k=3):
+        """
+        Classify a hand like predict_landmarks, with the `top_k` most likely letters
+        Returns {'prediction': letter, 'confidence': its calibrated probability,
+                 'top_k': [[letter, probability], ...], 'model_version': ...,
+                 'timing_ms': {'features': .., 'classify': ..}}
+        """
+        start = time.perf_counter()
+        features = build_features(landmarks_to_array(points))
+        featurized = time.perf_counter()
+        proba, version = self._classify(features)
+        classified = time.perf_counter()
+
+        # One argsort gives the argmax and the runners-up
+        class_labels = version.class_labels
+        top = np.argsort(proba)[::-1][:top_k]
+        return {
+            'prediction': class_labels[top[0]],
+            'confidence': float(proba[top[0]]),
+            'top_k': [[class_labels[i], float(proba[i])] for i in top],
+            'model_version': version.version,
+            'timing_ms': {'features': (featurized - start) * 1000, 'classify': (classified - featurized) * 1000},
+        }
+
+    def predict_proba_features(self, features):
+        """
+        Calibrated class probabilities for one (42,) feature row, columns follow `class_labels`
+        """
+        return self.predict_proba_with_labels(features)[0]
+
+    def predict_proba_with_labels(self, features):
+        """
+        (probabilities, class labels) of one (42,) feature row, both from the same
+        model version even if a new one is swapped in meanwhile
+        """
+        proba, version = self._classify(features)
+        return proba, version.class_labels
+
+    def _classify(self, features):
+        """(probabilities, the ModelVersion that computed them) of one feature row"""
+        self.registry.maybe_reload()
+        try:
+            with CLASSIFY_SECONDS.time(), self.registry.lease() as version:
+                return self._predict_proba(version, features), version
+        except Exception:
+            MODEL_ERROR_COUNT.inc()
+            raise
+
+    def _predict_proba(self, version, features):
+        key = self.cache.key(features) if self.cache else None
+        if key is not None:
+            # Keyed by version too: a swapped model never gets the old one's answers
+            key = version.cache_tag + key
+            proba = self.cache.get(key)
+            if proba is not None:
+                return proba
+
+        proba = version.predict_proba_row(features)
+
+        if key is not None:
+            proba = self.cache.put(key, proba)
+        return proba
+
+    def predict_batch(self, features):
+        """
+        Classify a 2-D array of feature rows in a single model call
+        Returns one Arabic label per row
+        """
+        with self.registry.lease() as version:
+            columns = np.argmax(version.predict_proba(features), axis=1)
+            return [version.class_labels[column] for column in columns]
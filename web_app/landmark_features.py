@@ -0,0 +1,40 @@
+"""
+Hand landmark -> feature vector
+Shared by the offline pipeline (src/3_process_data.py) and the web app so that
+training and serving features are identical by construction
+"""
+import numpy as np
+
+NUM_LANDMARKS = 21
+NUM_FEATURES = NUM_LANDMARKS * 2
+
+
+def landmarks_to_array(hand_landmarks):
+    """
+    Convert one hand to a (21, 2) float32 array of normalized (x, y)
+    Accepts MediaPipe NormalizedLandmark objects or (x, y) pairs
+    """
+    if len(hand_landmarks) and hasattr(hand_landmarks[0], 'x'):
+        coords = np.fromiter((v for landmark in hand_landmarks for v in (landmark.x, landmark.y)),
+                             dtype=np.float32, count=2 * len(hand_landmarks))
+        return coords.reshape(-1, 2)
+    return np.asarray(hand_landmarks, dtype=np.float32).reshape(-1, 2)
+
+
+def build_features(points, out=None):
+    """
+    Translate each hand so its top-left landmark corner is the origin
+    (21, 2) -> (42,) for one hand, (N, 21, 2) -> (N, 42) for a batch
+    Features are interleaved x0, y0, x1, y1, ... as float32, the dtype the tree
+    models compare against. `out` lets callers reuse a preallocated buffer
+    """
+    points = np.asarray(points, dtype=np.float32)
+    single = points.ndim == 2
+    hands = points.reshape(-1, NUM_LANDMARKS, 2)
+
+    if out is None:
+        out = np.empty((hands.shape[0], NUM_FEATURES), dtype=np.float32)
+    np.subtract(hands, hands.min(axis=1, keepdims=True),
+                out=out.reshape(hands.shape[0], NUM_LANDMARKS, 2))
+
+    return out[0] if single else out
@@ -0,0 +1,88 @@
+"""
+Server load -> client pacing hint
+Every prediction response carries a hint telling the client how often to
+send frames and how large to make them:
+
+    {"interval_ms": 150, "max_dim": 640, "jpeg_quality": 0.6}
+
+The hint follows the worker's pressure: the (smoothed) number of requests
+in flight relative to the detectors that can serve them, or the (smoothed)
+request latency relative to a target, whichever is worse. Below half of the
+capacity clients get the fastest pace and the sharpest frames; from there
+the hint backs off linearly until, at twice the capacity, clients send the
+smallest frames at the slowest pace. Both averages decay with time rather
+than per request, so the hint moves at the same speed whatever the traffic.
+"""
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+
+class LoadController:
+    """Pressure of one worker and the pacing hint derived from it"""
+
+    def __init__(self, capacity, target_latency_ms=100.0, time_constant=1.0,
+                 min_interval_ms=150, max_interval_ms=1000, max_dim=640, min_dim=320,
+                 max_quality=0.6, min_quality=0.35):
+        self.capacity = max(1, int(capacity))
+        self.target_latency = target_latency_ms / 1000.0
+        self.time_constant = time_constant
+        self.min_interval_ms = min_interval_ms
+        self.max_interval_ms = max_interval_ms
+        self.max_dim = max_dim
+        self.min_dim = min(min_dim, max_dim)
+        self.max_quality = max_quality
+        self.min_quality = min_quality
+
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self._in_flight_avg = 0.0
+        self._latency_avg = 0.0
+        self._in_flight_at = self._latency_at = time.monotonic()
+
+    @contextmanager
+    def track(self):
+        """Count one request as in flight and record its latency"""
+        start = time.monotonic()
+        with self._lock:
+            self.in_flight += 1
+            self._in_flight_avg = self._decay(self._in_flight_avg, self.in_flight, start - self._in_flight_at)
+            self._in_flight_at = start
+        try:
+            yield
+        finally:
+            end = time.monotonic()
+            with self._lock:
+                self.in_flight -= 1
+                self._latency_avg = self._decay(self._latency_avg, end - start, end - self._latency_at)
+                self._latency_at = end
+
+    def tracked(self, fn):
+        """Decorator tracking every call of a request handler"""
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with self.track():
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def pressure(self):
+        """1.0 means the worker is exactly at capacity"""
+        return max(self._in_flight_avg / self.capacity, self._latency_avg / self.target_latency)
+
+    def hint(self):
+        # 0 up to half the capacity, 1 from twice the capacity on
+        level = min(1.0, max(0.0, (self.pressure() - 0.5) / 1.5))
+        # Frame sizes stay multiples of 32, JPEG decoders work in 8/16 pixel blocks
+        max_dim = self.max_dim - level * (self.max_dim - self.min_dim)
+        return {
+            'interval_ms': int(self.min_interval_ms + level * (self.max_interval_ms - self.min_interval_ms)),
+            'max_dim': max(self.min_dim, int(max_dim) // 32 * 32),
+            'jpeg_quality': round(self.max_quality - level * (self.max_quality - self.min_quality), 2),
+        }
+
+    def _decay(self, average, sample, elapsed):
+        # Exponential moving average over time: a sample weighs by the time since the previous one
+        weight = 1.0 - math.exp(-elapsed / self.time_constant)
+        return average + weight * (sample - average)
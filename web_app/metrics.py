@@ -0,0 +1,245 @@
+"""
+Hot-path instrumentation, exposed in the Prometheus text format at /metrics
+Counters, gauges and fixed-bucket histograms with at most a few labels. An
+observation is one bisect and a few additions under a lock (about a
+microsecond), cheap enough to stay on for every frame in production.
+Metrics are per process: each gunicorn worker reports its own (workers = 1 by
+default), `process_start_time_seconds` tells restarted workers apart.
+"""
+import bisect
+import functools
+import os
+import threading
+import time
+
+# Seconds, from a cached landmark lookup (~50 µs) up to a slow full-frame detection
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+
+    def labels(self, *values):
+        """The child for one combination of label values; bind it once and reuse it on hot paths"""
+        values = tuple(str(value) for value in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def samples(self):
+        """[(suffix, label names, label values, value)]"""
+        out = []
+        for values, child in sorted(self._children.items()):
+            for suffix, names, extra, value in child.samples():
+                out.append((suffix, self.labelnames + names, values + extra, value))
+        return out
+
+    def _new_child(self):
+        raise NotImplementedError
+
+
+class _CounterChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self):
+        return [('', (), (), self.value)]
+
+
+class _GaugeChild(_CounterChild):
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        # `le` buckets are inclusive: the first bound >= value
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def time(self):
+        """Context manager observing the seconds its block took"""
+        return _Timer(self)
+
+    def samples(self):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        out = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            out.append(('_bucket', ('le',), (_format_value(bound),), cumulative))
+        out.append(('_sum', (), (), total))
+        out.append(('_count', (), (), cumulative))
+        return out
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        # The text format names counter families (and their samples) with _total
+        super().__init__(name + '_total', documentation, labelnames)
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+
+class Registry:
+    """
+    The metrics of one process plus collectors: callables run at scrape time
+    that report state kept elsewhere (batcher, cache and detector pool
+    counters) as [(name, kind, help, [(labels dict, value)])]
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for suffix, names, values, value in metric.samples():
+                lines.append(f'{metric.name}{suffix}{_format_labels(names, values)} {_format_value(value)}')
+
+        for collector in self._collectors:
+            for name, kind, documentation, samples in collector():
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in samples:
+                    lines.append(f'{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+
+def timed(histogram):
+    """Decorator observing every call's duration into a histogram child"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with histogram.time():
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Default registry and the metrics shared by the app and the classifier
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'tabsirah_stage_seconds', 'Seconds spent in each prediction stage', ('stage',))
+REQUEST_SECONDS = REGISTRY.histogram(
+    'tabsirah_request_seconds', 'Seconds to handle a prediction request', ('endpoint',))
+REQUEST_ERRORS = REGISTRY.counter(
+    'tabsirah_request_errors', 'Prediction requests that raised an exception', ('endpoint',))
+FRAMES = REGISTRY.counter(
+    'tabsirah_frames', 'Frames run through the hand detector, by whether a hand was found', ('hand',))
+DECODE_FAILURES = REGISTRY.counter(
+    'tabsirah_decode_failures', 'Uploads that were not valid base64 or a decodable image', ('reason',))
+MODEL_ERRORS = REGISTRY.counter(
+    'tabsirah_model_errors', 'Exceptions raised by the classifier model')
+STREAM_SESSIONS = REGISTRY.gauge(
+    'tabsirah_stream_sessions', 'Open /ws/predict connections')
+
+PROCESS_START = REGISTRY.gauge('process_start_time_seconds', 'Start time of the process since unix epoch').labels()
+PROCESS_START.set(time.time())
+# With preload_app this module is imported by the gunicorn master, workers restart the clock
+os.register_at_fork(after_in_child=lambda: PROCESS_START.set(time.time()))
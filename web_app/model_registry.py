@@ -0,0 +1,325 @@
+"""
+Versioned classifier models, hot-swapped without restarting the app
+models/registry/manifest.json lists every published version with its
+artifact and label map, and which version is active:
+
+    {"active": "20261018-134500",
+     "versions": {"20261018-134500": {"artifact": "20261018-134500/model_compiled.npz",
+                                      "labels": {"0": "ا", "1": "ب", ...},
+                                      "calibration": {"slopes": [...], "intercepts": [...]},
+                                      "created": "...", "metrics": {"accuracy": 0.98}}}}
+
+Training scripts publish() new versions. The app loads the active one and
+re-reads the manifest when it changes (checked at most every
+`check_interval` seconds) or on /admin/reload_model: the new version is
+loaded and warmed next to the old one, then swapped in atomically. Every
+prediction holds a lease on the version it started with, and the old
+version is closed only after its last lease is returned.
+Without a manifest the legacy models/model_compiled.npz or
+models/model_lightgbm.p is served as version "legacy".
+"""
+import csv
+import json
+import os
+import pickle
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from batching import MicroBatcher
+from calibration import Calibration
+from landmark_features import NUM_FEATURES
+from tree_ensemble import CompiledForest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REGISTRY_DIR = os.path.join(BASE_DIR, 'models', 'registry')
+LEGACY_MODEL_FILES = (os.path.join(BASE_DIR, 'models', 'model_compiled.npz'),
+                      os.path.join(BASE_DIR, 'models', 'model_lightgbm.p'))
+CLASS_MAPPING_FILE = os.path.join(BASE_DIR, 'dataset', 'class_mapping.csv')
+
+# Arabic letter of each dataset class (folder name), used when no mapping file is found
+DEFAULT_LABELS = {
+    0: 'ا', 1: 'ب', 2: 'ت', 3: 'ث', 4: 'ج', 5: 'ح', 6: 'خ', 7: 'د', 8: 'ذ', 9: 'ر',
+    10: 'ز', 11: 'س', 12: 'ش', 13: 'ص', 14: 'ض', 15: 'ط', 16: 'ظ', 17: 'ع', 18: 'غ', 19: 'ف',
+    20: 'ق', 21: 'ك', 22: 'ل', 23: 'م', 24: 'ن', 25: 'ه', 26: 'و', 27: 'ي', 28: 'ة', 29: 'لا',
+}
+
+
+def load_label_map(path=CLASS_MAPPING_FILE):
+    """{class id: Arabic letter} from dataset/class_mapping.csv, DEFAULT_LABELS if it doesn't exist"""
+    if not os.path.exists(path):
+        return dict(DEFAULT_LABELS)
+    mapping = {}
+    with open(path, encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            values = list(row.values())
+            class_id = row.get('Class_ID') or row.get('id') or values[0]
+            letter = row.get('Arabic_Letter') or row.get('letter') or values[1]
+            mapping[int(class_id)] = letter.strip()
+    return mapping
+
+
+def label_for(labels, class_key):
+    """
+    Arabic label of one model class (the dataset folder name, e.g. '16' or 16)
+    `labels` is keyed by class id (DEFAULT_LABELS) or by its string (manifests)
+    """
+    for key in (class_key, str(class_key)):
+        if key in labels:
+            return labels[key]
+    try:
+        return labels.get(int(class_key), str(class_key))
+    except (TypeError, ValueError):
+        return str(class_key)
+
+
+def load_model_file(path):
+    """A compiled forest (.npz) or a pickled {'model': estimator} (.p)"""
+    if path.endswith('.npz'):
+        return CompiledForest.load(path)
+    with open(path, 'rb') as f:
+        return pickle.load(f)['model']
+
+
+def read_manifest(registry_dir=REGISTRY_DIR):
+    with open(os.path.join(registry_dir, 'manifest.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_manifest(manifest, registry_dir=REGISTRY_DIR):
+    # Readers (every app worker) must never see a half-written file
+    path = os.path.join(registry_dir, 'manifest.json')
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def publish(model, labels, metrics=None, calibration=None, registry_dir=REGISTRY_DIR, activate=True):
+    """
+    Add a model version to the registry and (by default) make it the active one
+    `model` is a CompiledForest (saved as .npz) or any estimator with predict_proba
+    (pickled); `labels` maps its classes to Arabic letters and `calibration` (a
+    Calibration of its predict_proba columns) is optional. Returns the version name
+    """
+    os.makedirs(registry_dir, exist_ok=True)
+    try:
+        manifest = read_manifest(registry_dir)
+    except FileNotFoundError:
+        manifest = {'active': None, 'versions': {}}
+
+    version = time.strftime('%Y%m%d-%H%M%S')
+    suffix = 1
+    while version in manifest['versions'] or os.path.exists(os.path.join(registry_dir, version)):
+        suffix += 1
+        version = f"{time.strftime('%Y%m%d-%H%M%S')}-{suffix}"
+    os.makedirs(os.path.join(registry_dir, version))
+
+    if isinstance(model, CompiledForest):
+        artifact = f'{version}/model_compiled.npz'
+        model.save(os.path.join(registry_dir, artifact))
+    else:
+        artifact = f'{version}/model.p'
+        with open(os.path.join(registry_dir, artifact), 'wb') as f:
+            pickle.dump({'model': model}, f)
+
+    manifest['versions'][version] = {
+        'artifact': artifact,
+        'labels': {str(class_key): label_for(labels, class_key) for class_key in model.classes_},
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'metrics': metrics or {},
+    }
+    if calibration is not None:
+        manifest['versions'][version]['calibration'] = calibration.to_dict()
+    if activate or manifest['active'] is None:
+        manifest['active'] = version
+    write_manifest(manifest, registry_dir)
+    return version
+
+
+class ModelVersion:
+    """One loaded model with its label map, (optional) calibration and micro-batcher"""
+
+    def __init__(self, version, model, labels, batch_max_size=1, batch_max_wait_ms=2.0, calibration=None):
+        self.version = version
+        self.model = model
+        self.calibration = calibration
+        # Arabic label of each predict_proba column
+        self.class_labels = [label_for(labels, class_key) for class_key in model.classes_]
+        # Prefix of prediction cache keys, entries of another version never match
+        self.cache_tag = version.encode() + b'|'
+
+        # Concurrent requests share one model.predict_proba call (batch_max_size=1 disables it)
+        self.batcher = None
+        if batch_max_size > 1:
+            self.batcher = MicroBatcher(self.predict_proba, batch_max_size, batch_max_wait_ms)
+
+        self.leases = 0
+        self.retired = False
+
+    def predict_proba(self, rows):
+        """Calibrated class probabilities of a 2-D array of feature rows"""
+        proba = self.model.predict_proba(rows)
+        if self.calibration is not None:
+            proba = self.calibration.apply(proba)
+        return proba
+
+    def predict_proba_row(self, features):
+        if self.batcher:
+            return self.batcher.predict(features)
+        return self.predict_proba(features[np.newaxis])[0]
+
+    def close(self):
+        if self.batcher:
+            self.batcher.close()
+
+
+class ModelRegistry:
+    """
+    The active ModelVersion of this process, swapped when the manifest changes
+    """
+
+    def __init__(self, registry_dir=REGISTRY_DIR, legacy_files=LEGACY_MODEL_FILES,
+                 batch_max_size=1, batch_max_wait_ms=2.0, check_interval=5.0):
+        self.registry_dir = registry_dir
+        self.manifest_path = os.path.join(registry_dir, 'manifest.json')
+        self.legacy_files = legacy_files
+        self.batch_max_size = batch_max_size
+        self.batch_max_wait_ms = batch_max_wait_ms
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._signature = None
+        self._next_check = 0.0
+        self._draining = []
+        self._listeners = []
+
+        # Counters
+        self.swaps = 0
+        self.failed_reloads = 0
+
+        self.active = self._load(self._manifest_signature())
+
+    def on_swap(self, listener):
+        """Call `listener(new_version)` after every swap (in the reloading thread)"""
+        self._listeners.append(listener)
+
+    @contextmanager
+    def lease(self):
+        """The active version, kept open until the block exits even if a swap happens meanwhile"""
+        with self._lock:
+            version = self.active
+            version.leases += 1
+        try:
+            yield version
+        finally:
+            with self._lock:
+                version.leases -= 1
+                drained = version.retired and version.leases == 0
+                if drained:
+                    self._draining.remove(version)
+            if drained:
+                version.close()
+
+    def maybe_reload(self):
+        """Cheap check on the request path: reload if the manifest changed, at most every check_interval"""
+        if not self.check_interval or time.monotonic() < self._next_check:
+            return
+        # Only one request pays for the reload, the others keep using the active version
+        if not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_check = time.monotonic() + self.check_interval
+            signature = self._manifest_signature()
+            if signature != self._signature:
+                self._reload(signature)
+        except Exception as e:
+            self.failed_reloads += 1
+            print(f"Model reload failed, keeping {self.active.version}: {e}")
+        finally:
+            self._reload_lock.release()
+
+    def reload(self, version=None):
+        """
+        Load the manifest's active version now, after making `version` the active
+        one if given (other workers follow through the manifest change)
+        Returns the active version name. Raises KeyError for an unknown version
+        """
+        with self._reload_lock:
+            if version is not None:
+                manifest = read_manifest(self.registry_dir)
+                if version not in manifest['versions']:
+                    raise KeyError(version)
+                if manifest['active'] != version:
+                    manifest['active'] = version
+                    write_manifest(manifest, self.registry_dir)
+            self._next_check = time.monotonic() + self.check_interval
+            signature = self._manifest_signature()
+            if signature != self._signature:
+                self._reload(signature)
+            return self.active.version
+
+    def stats(self):
+        with self._lock:
+            draining = [version.version for version in self._draining]
+        return {
+            'version': self.active.version,
+            'swaps': self.swaps,
+            'failed_reloads': self.failed_reloads,
+            'draining': draining,
+        }
+
+    def _reload(self, signature):
+        if signature is not None and read_manifest(self.registry_dir)['active'] == self.active.version:
+            # Another version was published without activating it
+            self._signature = signature
+            return
+        new = self._load(signature)
+        if new.version == self.active.version:
+            return
+        with self._lock:
+            old = self.active
+            self.active = new
+            old.retired = True
+            drained = old.leases == 0
+            if not drained:
+                self._draining.append(old)
+            self.swaps += 1
+        if drained:
+            old.close()
+        print(f"Model swapped: {old.version} -> {new.version}")
+        for listener in self._listeners:
+            listener(new)
+
+    def _load(self, signature):
+        """Load and warm the version the manifest points to (or the legacy files)"""
+        if signature is not None:
+            manifest = read_manifest(self.registry_dir)
+            name = manifest['active']
+            entry = manifest['versions'][name]
+            model = load_model_file(os.path.join(self.registry_dir, entry['artifact']))
+            labels = entry['labels']
+            calibration = Calibration.from_dict(entry['calibration']) if 'calibration' in entry else None
+        else:
+            path = next((path for path in self.legacy_files if os.path.exists(path)), None)
+            if path is None:
+                raise FileNotFoundError(f"No model registry at {self.registry_dir} and no model file")
+            name = 'legacy'
+            model = load_model_file(path)
+            labels = DEFAULT_LABELS
+            calibration = None
+
+        # First call outside any request: lazy allocations, page faults of the arrays
+        model.predict_proba(np.zeros((1, NUM_FEATURES), dtype=np.float32))
+        self._signature = signature
+        return ModelVersion(name, model, labels, self.batch_max_size, self.batch_max_wait_ms, calibration)
+
+    def _manifest_signature(self):
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
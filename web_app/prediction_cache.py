@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+INT32_MAX = np.iinfo(np.int32).max
+
+
+class PredictionCache:
+    """
+    Bounded LRU + TTL cache of class probabilities keyed by hand pose
+    Features are quantized to a `quantum` grid (normalized image units) before
+    hashing, so a learner holding the same sign across frames hits the same entry
+    """
+
+    def __init__(self, max_entries=4096, ttl_seconds=300.0, quantum=0.005):
+        self.max_entries = int(max_entries)
+        self.ttl = float(ttl_seconds)
+        self.quantum = float(quantum)
+
+        self._entries = OrderedDict()  # key -> (proba, expires_at)
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def key(self, features):
+        """Bytes of the quantized features, None if they don't fit the key's int32 grid"""
+        grid = np.rint(np.asarray(features, dtype=np.float64) / self.quantum)
+        # A cast that wraps would give far-apart poses the same key
+        if not np.all(np.abs(grid) <= INT32_MAX):
+            return None
+        return grid.astype(np.int32).tobytes()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            proba, expires_at = entry
+            if expires_at < now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return proba
+
+    def put(self, key, proba):
+        # Cached arrays are shared between requests
+        proba = np.array(proba)
+        proba.flags.writeable = False
+
+        with self._lock:
+            self._entries[key] = (proba, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return proba
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'quantum': self.quantum,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': (self.hits / lookups) if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
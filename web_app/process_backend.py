@@ -0,0 +1,224 @@
+"""
+Optional multi-process inference backend
+Decoded frames are handed to long-lived worker processes through
+multiprocessing.shared_memory slots instead of being pickled; each worker owns
+its own HandLandmarker and model, so detection runs in parallel outside the
+Flask worker's GIL. Meant for the gthread worker class (INFERENCE_BACKEND=process),
+it refuses to start under gevent. A slot is reused only once its worker has
+answered, and a worker that dies is respawned, failing the frames it held.
+"""
+import atexit
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Largest frame a slot can hold (1920x1080 RGB)
+DEFAULT_MAX_FRAME_BYTES = 1920 * 1080 * 3
+
+# Seconds between liveness checks of the workers while a request waits
+WORKER_CHECK_SECONDS = 1.0
+
+
+def default_classifier():
+    # Each process gets a single detector and no batching/cache threads
+    from inference_classifier import SignLanguageClassifier
+    return SignLanguageClassifier(batch_max_size=1, detector_pool_size=1)
+
+
+def _worker_main(slot_names, tasks, results, factory):
+    """
+    Worker process loop, initialized like init_worker in src/3_process_data.py:
+    build the classifier once, then serve frames until a None task arrives
+    """
+    from landmark_features import landmarks_to_array
+
+    classifier = factory()
+    slots = [shared_memory.SharedMemory(name=name) for name in slot_names]
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+
+            request_id, slot, shape, top_k = task
+            try:
+                frame = np.ndarray(shape, dtype=np.uint8, buffer=slots[slot].buf)
+                detail, detection_result = classifier.predict_frame_detailed(frame, top_k)
+                hands = [landmarks_to_array(hand) for hand in detection_result.hand_landmarks]
+                results.put((request_id, detail, hands, None))
+            except Exception as e:
+                results.put((request_id, None, [], str(e)))
+    finally:
+        for shm in slots:
+            shm.close()
+
+
+class ProcessInferenceBackend:
+    def __init__(self, num_workers=2, max_frame_bytes=DEFAULT_MAX_FRAME_BYTES, factory=default_classifier):
+        self.num_workers = max(1, int(num_workers))
+        self.max_frame_bytes = int(max_frame_bytes)
+        self.factory = factory
+
+        self._start_lock = threading.Lock()
+        self._pid = None
+
+        # Counters
+        self.restarts = 0
+
+    def start(self):
+        """Spawn the worker processes now instead of on the first frame"""
+        if self._pid != os.getpid():
+            self._start()
+
+    def predict(self, frame_rgb, timeout=30.0, top_k=3):
+        """
+        Detect and classify one RGB frame in a worker process
+        Returns (detail, hands): the classifier's predict_detailed of the first hand
+        (None without a hand) and a list of (21, 2) float32 landmark arrays
+        """
+        if self._pid != os.getpid():
+            self._start()
+
+        frame_rgb = np.ascontiguousarray(frame_rgb, dtype=np.uint8)
+        if frame_rgb.nbytes > self.max_frame_bytes:
+            raise ValueError(f"Frame of {frame_rgb.nbytes} bytes exceeds the {self.max_frame_bytes} byte slot")
+
+        self._check_workers()
+        try:
+            slot = self._free_slots.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("No free frame slot, the inference workers are busy") from None
+        shm_frame = np.ndarray(frame_rgb.shape, dtype=np.uint8, buffer=self._slots[slot].buf)
+        shm_frame[...] = frame_rgb
+
+        future = Future()
+        with self._lock:
+            request_id = next(self._request_ids)
+            # Least busy worker; the slot is returned only once that worker has answered
+            # (or died), never on a timeout while it may still be reading the frame
+            worker = min(range(self.num_workers), key=lambda i: len(self._assigned[i]))
+            self._assigned[worker].add(request_id)
+            self._requests[request_id] = (future, slot, worker)
+        self._task_queues[worker].put((request_id, slot, frame_rgb.shape, top_k))
+
+        # Wait in short steps, so a worker that died with this frame fails it right away
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                detail, hands, error = future.result(min(WORKER_CHECK_SECONDS, max(0.0, deadline - time.monotonic())))
+                break
+            except TimeoutError:
+                if time.monotonic() >= deadline:
+                    raise
+                self._check_workers()
+
+        if error:
+            raise RuntimeError(error)
+        return detail, hands
+
+    def close(self):
+        if self._pid != os.getpid():
+            return
+        for tasks in self._task_queues:
+            tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+        self._results.put(None)
+        for shm in self._slots:
+            shm.close()
+            shm.unlink()
+        self._pid = None
+
+    def _start(self):
+        # Started lazily in the serving process: with preload_app the backend is
+        # built in the gunicorn master, which must not own the worker processes
+        if _gevent_patched():
+            # _dispatch_results blocks in a multiprocessing queue, which would block the gevent hub
+            raise RuntimeError("INFERENCE_BACKEND=process needs the gthread worker class "
+                               "(GUNICORN_WORKER_CLASS=gthread)")
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+
+            # Two slots per worker so the next frame can be copied in while one is processed
+            num_slots = 2 * self.num_workers
+            self._slots = [shared_memory.SharedMemory(create=True, size=self.max_frame_bytes)
+                           for _ in range(num_slots)]
+            self._free_slots = queue.Queue()
+            for slot in range(num_slots):
+                self._free_slots.put(slot)
+
+            # spawn: MediaPipe's graph threads don't survive fork
+            self._context = multiprocessing.get_context('spawn')
+            self._results = self._context.Queue()
+            # One task queue per worker, so the frames a dead worker held are known
+            self._task_queues = [self._context.Queue() for _ in range(self.num_workers)]
+            self._processes = [self._spawn(i) for i in range(self.num_workers)]
+
+            self._lock = threading.Lock()
+            self._requests = {}  # request id -> (future, slot, worker)
+            self._assigned = [set() for _ in range(self.num_workers)]
+            self._request_ids = itertools.count()
+            self._pid = os.getpid()
+            atexit.register(self.close)
+        # Outside the lock, like MicroBatcher._start
+        threading.Thread(target=self._dispatch_results, name='inference-results', daemon=True).start()
+
+    def _spawn(self, i):
+        process = self._context.Process(
+            target=_worker_main,
+            args=([shm.name for shm in self._slots], self._task_queues[i], self._results, self.factory),
+            name=f'inference-{i}', daemon=True)
+        process.start()
+        return process
+
+    def _check_workers(self):
+        """Fail the frames of dead workers (freeing their slots) and respawn them"""
+        for i, process in enumerate(self._processes):
+            if process.is_alive():
+                continue
+            with self._lock:
+                if self._processes[i] is not process:
+                    continue  # Another request already replaced it
+                lost = [self._requests.pop(request_id) for request_id in self._assigned[i]]
+                self._assigned[i] = set()
+                # Its queue may still hold frames nobody will read
+                self._task_queues[i] = self._context.Queue()
+                self._processes[i] = self._spawn(i)
+                self.restarts += 1
+            print(f"Inference worker {i} died (exit code {process.exitcode}), restarted")
+            for future, slot, _ in lost:
+                self._free_slots.put(slot)
+                future.set_result((None, [], f"Inference worker {i} died"))
+
+    def _dispatch_results(self):
+        while True:
+            result = self._results.get()
+            if result is None:
+                break
+            request_id, detail, hands, error = result
+            with self._lock:
+                entry = self._requests.pop(request_id, None)
+                if entry is not None:
+                    self._assigned[entry[2]].discard(request_id)
+            if entry is None:
+                continue  # Already failed when its worker died
+            future, slot, _ = entry
+            # The worker is done with the slot once it has answered
+            self._free_slots.put(slot)
+            future.set_result((detail, hands, error))
+
+
+def _gevent_patched():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
@@ -0,0 +1,97 @@
+from collections import Counter, deque
+
+import numpy as np
+
+from metrics import REGISTRY
+
+RECOGNIZER_FRAMES = REGISTRY.counter(
+    'tabsirah_recognizer_frames', 'Streamed hand poses, classified or reusing the previous probabilities',
+    ('result',))
+CLASSIFIED_FRAMES = RECOGNIZER_FRAMES.labels('classified')
+SKIPPED_FRAMES = RECOGNIZER_FRAMES.labels('skipped')
+
+
+class SequenceRecognizer:
+    """
+    Temporal smoothing for one learner's stream of hand poses
+    Keeps a ring buffer of the last `window` feature vectors and class
+    probabilities and only emits a letter once it wins at least `min_votes`
+    frames of the window with a mean probability of `min_confidence`.
+    Frames whose pose barely moved since the last classified one (largest
+    feature delta below `motion_epsilon`, in normalized image units) reuse the
+    previous probabilities instead of calling the model again, which is most
+    frames while a learner holds a sign
+    """
+
+    def __init__(self, classifier, window=5, min_votes=3, min_confidence=0.5, motion_epsilon=0.01):
+        self.classifier = classifier
+        self.window = window
+        self.min_votes = min_votes
+        self.min_confidence = min_confidence
+        self.motion_epsilon = motion_epsilon
+
+        self.features = deque(maxlen=window)
+        self.probas = deque(maxlen=window)
+        self._last_classified = None
+        self._last_proba = None
+        self._labels = None  # Class labels of the model version the window was classified with
+
+        # Counters
+        self.frames = 0
+        self.classified = 0
+        self.skipped = 0
+
+    def reset(self):
+        """Forget the history, e.g. when the hand leaves the frame"""
+        self.features.clear()
+        self.probas.clear()
+        self._last_classified = None
+        self._last_proba = None
+
+    def update(self, features):
+        """
+        Add one (42,) feature vector and return
+        {'label': emitted letter or None, 'raw': this frame's letter,
+         'confidence': mean window probability of the winner,
+         'raw_confidence': this frame's probability of 'raw', 'skipped': bool}
+        """
+        self.frames += 1
+        skipped = (self._last_classified is not None and
+                   np.abs(features - self._last_classified).max() < self.motion_epsilon)
+
+        if skipped:
+            proba = self._last_proba
+            self.skipped += 1
+            SKIPPED_FRAMES.inc()
+        else:
+            proba, labels = self.classifier.predict_proba_with_labels(features)
+            if labels is not self._labels:
+                # A new model version was swapped in: its columns can't be mixed with the old ones
+                self.features.clear()
+                self.probas.clear()
+                self._labels = labels
+            self._last_classified = features
+            self._last_proba = proba
+            self.classified += 1
+            CLASSIFIED_FRAMES.inc()
+
+        self.features.append(features)
+        self.probas.append(proba)
+
+        votes = Counter(int(np.argmax(p)) for p in self.probas)
+        winner, count = votes.most_common(1)[0]
+        confidence = float(np.mean([p[winner] for p in self.probas]))
+        stable = count >= self.min_votes and confidence >= self.min_confidence
+
+        labels = self._labels
+        raw = int(np.argmax(proba))
+        return {
+            'label': labels[winner] if stable else None,
+            'raw': labels[raw],
+            'confidence': confidence,
+            'raw_confidence': float(proba[raw]),
+            'skipped': bool(skipped),
+        }
+
+    def stats(self):
+        return {'frames': self.frames, 'classified': self.classified, 'skipped': self.skipped}
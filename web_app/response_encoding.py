@@ -0,0 +1,84 @@
+"""
+Prediction response formats, negotiated with the Accept header (or ?format= on /ws/predict)
+
+    json    application/json                      landmarks as [[{"x": .., "y": ..}, ...], ...] (default)
+    flat    application/vnd.tabsirah.flat+json    landmarks as one flat [x0, y0, x1, y1, ...] list,
+                                                  21 points per hand, 5 decimals
+    packed  application/vnd.tabsirah.packed       binary, see below
+    msgpack application/x-msgpack                 MessagePack map, landmarks as float32 bytes
+                                                  (offered only when msgpack is installed)
+
+Packed layout, little-endian:
+
+    uint16            number of hands N
+    uint16            byte length H of the header
+    float32[N*21*2]   landmarks, x0, y0, x1, y1, ... of each hand (4-byte aligned,
+                      readable as new Float32Array(buffer, 4, N * 42) in the browser)
+    H bytes           UTF-8 JSON of the other fields: prediction, confidence, hint, ...
+
+Responses are built with landmarks as a (N, 21, 2) float32 array and only
+encoded here, so the compact formats never create a Python object per point.
+Errors are always plain JSON, clients tell them apart by the Content-Type.
+"""
+import json
+import struct
+
+import numpy as np
+
+from landmark_features import NUM_LANDMARKS
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = 'application/json'
+FLAT_JSON = 'application/vnd.tabsirah.flat+json'
+PACKED = 'application/vnd.tabsirah.packed'
+MSGPACK = 'application/x-msgpack'
+
+# ?format= names of /ws/predict
+FORMATS = {'json': JSON, 'flat': FLAT_JSON, 'packed': PACKED}
+if msgpack is not None:
+    FORMATS['msgpack'] = MSGPACK
+
+# Plain JSON first: it wins for Accept: */* and browsers' defaults
+MEDIA_TYPES = tuple(FORMATS.values())
+
+_PACKED_HEADER = struct.Struct('<HH')
+
+
+def hands_array(hands):
+    """(N, 21, 2) float32 array of a list of hands, of (21, 2) arrays or point lists"""
+    return np.asarray(hands, dtype=np.float32).reshape(-1, NUM_LANDMARKS, 2)
+
+
+def is_binary(media_type):
+    return media_type in (PACKED, MSGPACK)
+
+
+def encode_response(response, media_type=JSON):
+    """
+    Encode a prediction response dict, `landmarks` may be an array or a list
+    Returns a str for the JSON formats, bytes for the binary ones
+    """
+    fields = dict(response)
+    # Absent from /predict_landmarks answers, and left out of them here too
+    has_landmarks = 'landmarks' in fields
+    hands = hands_array(fields.pop('landmarks', ()))
+
+    if media_type == PACKED:
+        header = json.dumps(fields, ensure_ascii=False).encode('utf-8')
+        body = hands.astype('<f4', copy=False).tobytes()
+        return _PACKED_HEADER.pack(len(hands), len(header)) + body + header
+    if has_landmarks and media_type == FLAT_JSON:
+        fields['landmarks'] = hands.astype(np.float64).round(5).ravel().tolist()
+    elif has_landmarks and media_type == MSGPACK:
+        fields['landmarks'] = hands.astype('<f4', copy=False).tobytes()
+        fields['hands'] = len(hands)
+    elif has_landmarks:
+        fields['landmarks'] = [[{'x': x, 'y': y} for x, y in hand] for hand in hands.tolist()]
+
+    if media_type == MSGPACK:
+        return msgpack.packb(fields, use_bin_type=True)
+    return json.dumps(fields, ensure_ascii=False)
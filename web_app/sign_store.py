@@ -0,0 +1,97 @@
+import hashlib
+import os
+import threading
+import time
+
+from arabic_text import normalize_char_for_image
+
+
+class SignImage:
+    def __init__(self, filename, data, mtime):
+        self.filename = filename
+        self.data = data
+        self.etag = hashlib.sha1(data).hexdigest()
+        self.last_modified = mtime
+
+
+class SignImageStore:
+    """
+    In-memory index of the reference sign images in static/signs
+    Built once at startup: every normalized letter maps to its chosen version,
+    with the bytes and ETag kept in memory, so a lookup costs no filesystem calls.
+    Version rule (same as the old glob lookup): `<letter>.jpg` if it exists,
+    otherwise the last of the sorted `<letter>*.jpg` files ('ب_v2.jpg' beats 'ب_v1.jpg').
+    The directory listing is re-checked at most every `check_interval` seconds so
+    images dropped in by src/sync_images.py or copy_signs.py are picked up;
+    reload() forces it.
+    """
+
+    def __init__(self, signs_dir, check_interval=5.0):
+        self.signs_dir = signs_dir
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._index = {}
+        self._signature = None
+        self._next_check = 0.0
+        self.reloads = 0
+
+        self.reload()
+
+    def get(self, char):
+        """Chosen SignImage for a (possibly unnormalized) letter, None if there is none"""
+        if self.check_interval and time.monotonic() >= self._next_check:
+            self._reload_if_changed()
+        return self._index.get(normalize_char_for_image(char))
+
+    def letters(self):
+        return sorted(self._index)
+
+    def reload(self):
+        """Rebuild the index from disk, returns the number of letters indexed"""
+        with self._lock:
+            signature = self._scan()
+            self._index = self._build(signature)
+            self._signature = signature
+            self._next_check = time.monotonic() + self.check_interval
+            self.reloads += 1
+            return len(self._index)
+
+    def _scan(self):
+        # (name, mtime, size) of every image, overwritten files change it too
+        if not os.path.isdir(self.signs_dir):
+            return ()
+        with os.scandir(self.signs_dir) as entries:
+            return tuple(sorted((entry.name, entry.stat().st_mtime, entry.stat().st_size)
+                                for entry in entries
+                                if entry.is_file() and entry.name.lower().endswith('.jpg')))
+
+    def _build(self, signature):
+        exact = {}
+        by_prefix = {}
+        for name, mtime, _ in signature:
+            stem = os.path.splitext(name)[0]
+            exact[stem] = name
+            for end in range(1, len(stem) + 1):
+                by_prefix.setdefault(stem[:end], []).append(name)
+
+        mtimes = {name: mtime for name, mtime, _ in signature}
+        loaded = {}
+        index = {}
+        for prefix, names in by_prefix.items():
+            # PRIORITY 1: exact match, PRIORITY 2: last versioned file
+            name = exact.get(prefix) or max(names)
+            if name not in loaded:
+                with open(os.path.join(self.signs_dir, name), 'rb') as f:
+                    loaded[name] = SignImage(name, f.read(), mtimes[name])
+            index[prefix] = loaded[name]
+        return index
+
+    def _reload_if_changed(self):
+        with self._lock:
+            if time.monotonic() < self._next_check:
+                return
+            self._next_check = time.monotonic() + self.check_interval
+            changed = self._scan() != self._signature
+        if changed:
+            self.reload()
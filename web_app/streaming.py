@@ -0,0 +1,64 @@
+from simple_websocket import ConnectionClosed
+
+from metrics import REGISTRY, STAGE_SECONDS
+from response_encoding import JSON, encode_response
+
+DROPPED_FRAMES = REGISTRY.counter(
+    'tabsirah_stream_dropped_frames', 'Stale /ws/predict frames dropped for a newer one').labels()
+SERIALIZE_SECONDS = STAGE_SECONDS.labels('serialize')
+
+
+class StreamSession:
+    """
+    State of one /ws/predict connection
+    Applies backpressure by dropping stale frames: whatever queued up while the
+    previous frame was being classified is discarded except the newest message
+    """
+
+    def __init__(self, recognizer=None, tracker=None, media_type=JSON):
+        self.recognizer = recognizer
+        self.tracker = tracker
+        # Response format chosen when connecting (see response_encoding.py)
+        self.media_type = media_type
+        self.episode = None
+        self.frames_received = 0
+        self.frames_dropped = 0
+        self.predictions_sent = 0
+
+    def next_message(self, ws):
+        """
+        Block for the next message, then drain anything already queued behind it
+        and return only the most recent one. Returns None once the client is gone
+        """
+        try:
+            message = ws.receive()
+            if message is None:
+                return None
+            self.frames_received += 1
+
+            while True:
+                newer = ws.receive(timeout=0)
+                if newer is None:
+                    return message
+                self.frames_received += 1
+                self.frames_dropped += 1
+                DROPPED_FRAMES.inc()
+                message = newer
+        except ConnectionClosed:
+            return None
+
+    def send(self, ws, response):
+        """Push a prediction to the client, returns False if the connection is closed"""
+        with SERIALIZE_SECONDS.time():
+            body = encode_response(response, JSON if 'error' in response else self.media_type)
+        try:
+            ws.send(body)
+        except ConnectionClosed:
+            return False
+        self.predictions_sent += 1
+        return True
+
+    def close(self):
+        """Release the session's hand tracker (its VIDEO-mode detector)"""
+        if self.tracker:
+            self.tracker.close()
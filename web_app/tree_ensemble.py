@@ -0,0 +1,124 @@
+"""
+Pure-NumPy evaluator for a trained scikit-learn tree ensemble
+The trees are flattened into a handful of arrays (feature, threshold, children,
+leaf values) so the app can classify without sklearn's per-call validation and
+joblib overhead, and load a much smaller file than the pickled forest
+"""
+import numpy as np
+
+# Rows evaluated per pass, bounds the (rows, trees, classes) temporary
+ROW_CHUNK = 256
+
+
+class CompiledForest:
+    def __init__(self, feature, threshold, left, right, leaf_id, leaf_value, roots, classes, max_depth):
+        self.feature = feature        # (n_nodes,) split feature, 0 for leaves
+        self.threshold = threshold    # (n_nodes,) float64, same as sklearn
+        self.left = left              # (n_nodes,) global child index, leaves point to themselves
+        self.right = right
+        self.leaf_id = leaf_id        # (n_nodes,) row in leaf_value, -1 for split nodes
+        self.leaf_value = leaf_value  # (n_leaves, n_classes) class probabilities
+        self.roots = roots            # (n_trees,) root node of each tree
+        self.classes_ = classes
+        self.max_depth = int(max_depth)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """
+        Flatten a fitted RandomForest/ExtraTrees/DecisionTree classifier
+        """
+        estimators = getattr(model, 'estimators_', [model])
+        if not hasattr(estimators[0], 'tree_'):
+            raise TypeError(f"Unsupported model type: {type(model).__name__}")
+
+        features, thresholds, lefts, rights, leaf_ids, leaf_values, roots = [], [], [], [], [], [], []
+        offset = 0
+        n_leaves = 0
+        max_depth = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(n_nodes) + offset
+
+            # Leaves loop onto themselves so every row can take max_depth steps
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+
+            leaf_id = np.full(n_nodes, -1)
+            leaf_id[is_leaf] = np.arange(is_leaf.sum()) + n_leaves
+            leaf_ids.append(leaf_id)
+
+            value = tree.value[is_leaf, 0, :]
+            leaf_values.append(value / value.sum(axis=1, keepdims=True))
+
+            roots.append(offset)
+            offset += n_nodes
+            n_leaves += is_leaf.sum()
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int16),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.int32),
+            right=np.concatenate(rights).astype(np.int32),
+            leaf_id=np.concatenate(leaf_ids).astype(np.int32),
+            leaf_value=np.concatenate(leaf_values).astype(np.float32),
+            roots=np.asarray(roots, dtype=np.int32),
+            classes=np.asarray(model.classes_),
+            max_depth=max_depth,
+        )
+
+    def save(self, path):
+        # Pure leaves are mostly zeros, so compression shrinks the file a lot
+        np.savez_compressed(
+            path, feature=self.feature, threshold=self.threshold, left=self.left,
+            right=self.right, leaf_id=self.leaf_id, leaf_value=self.leaf_value,
+            roots=self.roots, classes=self.classes_, max_depth=np.int32(self.max_depth))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as f:
+            return cls(f['feature'], f['threshold'], f['left'], f['right'], f['leaf_id'],
+                       f['leaf_value'], f['roots'], f['classes'], f['max_depth'])
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[np.newaxis]
+
+        proba = np.empty((len(X), self.leaf_value.shape[1]), dtype=np.float64)
+        for start in range(0, len(X), ROW_CHUNK):
+            chunk = X[start:start + ROW_CHUNK]
+            rows = np.arange(len(chunk))[:, np.newaxis]
+            node = np.broadcast_to(self.roots, (len(chunk), self.n_trees))
+
+            # Walk all trees for all rows at once, one level per step
+            for _ in range(self.max_depth):
+                go_left = chunk[rows, self.feature[node]] <= self.threshold[node]
+                node = np.where(go_left, self.left[node], self.right[node])
+
+            leaves = self.leaf_value[self.leaf_id[node]]
+            proba[start:start + len(chunk)] = leaves.sum(axis=1, dtype=np.float64) / self.n_trees
+        return proba
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def check_parity(model, forest, X):
+    """
+    Compare the compiled forest with the original sklearn model on X
+    Returns (labels_match_ratio, max_abs_proba_diff)
+    """
+    X = np.asarray(X, dtype=np.float32)
+    expected = model.predict_proba(X)
+    actual = forest.predict_proba(X)
+    match = np.mean(model.classes_[expected.argmax(axis=1)] == forest.predict(X))
+    return float(match), float(np.abs(expected - actual).max())
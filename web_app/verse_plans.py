@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Verse-to-sign render plans
+Every verse in surah_data is compiled once into the signs the learner performs:
+diacritics are dropped, alef/yaa/taa marbuta forms are normalized like the
+image lookup, and a lam followed by an alef becomes the single لا sign. A plan
+carries the labels the model may answer for each sign, versioned image URLs
+and one sprite sheet, so a verse renders from one JSON request and one image.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from urllib.parse import quote
+
+import cv2
+import numpy as np
+
+from arabic_text import normalize_char_for_image
+
+LAM = 'ل'
+LAM_ALEF = 'لا'
+# Alef forms that join a preceding lam into the لا ligature (hamza alone doesn't)
+_ALEF_FORMS = frozenset('اأإآٱ')
+
+# Sprite cells are square, twice the 96px card image for high-DPI screens
+SPRITE_CELL = 192
+
+
+def compile_words(text):
+    """
+    Split a verse into words of sign steps
+    Each step is (text, target, start, end): the original characters (with their
+    diacritics), the normalized sign and the character span inside the word
+    """
+    words = []
+    for word in text.split():
+        steps = []
+        i = 0
+        while i < len(word):
+            target = normalize_char_for_image(word[i])
+            if not target:  # Stray diacritic at the start of a word
+                i += 1
+                continue
+
+            start = i
+            i += 1
+            if word[start] == LAM:
+                j = i
+                while j < len(word) and not normalize_char_for_image(word[j]):
+                    j += 1
+                if j < len(word) and word[j] in _ALEF_FORMS:
+                    target = LAM_ALEF
+                    i = j + 1
+
+            # Diacritics belong to the sign before them
+            while i < len(word) and not normalize_char_for_image(word[i]):
+                i += 1
+            steps.append((word[start:i], target, start, i))
+        if steps:
+            words.append((word, steps))
+    return words
+
+
+class VersePlanner:
+    def __init__(self, surahs, sign_store, labels=(), max_sprites=64):
+        self.sign_store = sign_store
+        self.max_sprites = max_sprites
+
+        self._accept = self._accept_map(labels)
+        self._labels_version = 0
+
+        # Precompile every verse once, plans are rebuilt only when the sign images or model labels change
+        self._words = {}
+        for surah in surahs.values():
+            for verse in surah['verses']:
+                self._words[verse] = compile_words(verse)
+
+        self._lock = threading.Lock()
+        self._plans = {}
+        self._plans_version = None
+        self._sprites = OrderedDict()
+
+    def plan(self, text):
+        """Render plan for a verse, or for any other practice text"""
+        text = ' '.join(text.split())
+        words = self._words.get(text)
+        if words is None:
+            return self._build(text, compile_words(text))
+
+        version = (self.sign_store.reloads, self._labels_version)
+        with self._lock:
+            if version != self._plans_version:
+                self._plans = {}
+                self._plans_version = version
+            plan = self._plans.get(text)
+        if plan is None:
+            plan = self._build(text, words)
+            with self._lock:
+                if version == self._plans_version:
+                    self._plans[text] = plan
+        return plan
+
+    def set_labels(self, labels):
+        """Model labels changed (a new model version): rebuild the plans with them"""
+        accept = self._accept_map(labels)
+        with self._lock:
+            self._accept = accept
+            self._labels_version += 1
+
+    def prebuild(self):
+        """Build the plan of every verse now, e.g. once in the gunicorn master so workers share them"""
+        for text in self._words:
+            self.plan(text)
+        return len(self._words)
+
+    def sprite(self, letters):
+        """
+        JPEG sprite sheet of the sign images of `letters`, one square cell per
+        letter laid out left to right in list order. Repeated letters and letters
+        without an image are dropped, so a sheet is never wider than the sign set
+        Returns (jpeg bytes, version) or None if no letter has an image
+        """
+        known = set(self.sign_store.letters())
+        letters = [letter for letter in dict.fromkeys(letters) if letter in known]
+        images = [self.sign_store.get(letter) for letter in letters]
+        if not images or None in images:
+            return None
+        version = self._sprite_version(images)
+
+        key = (tuple(letters), version)
+        with self._lock:
+            data = self._sprites.get(key)
+            if data is not None:
+                self._sprites.move_to_end(key)
+                return data, version
+
+        sheet = np.full((SPRITE_CELL, SPRITE_CELL * len(images), 3), 255, dtype=np.uint8)
+        for i, image in enumerate(images):
+            sign = cv2.imdecode(np.frombuffer(image.data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if sign is None:
+                continue
+            # Fit inside the cell keeping the aspect ratio (like object-contain)
+            height, width = sign.shape[:2]
+            scale = SPRITE_CELL / max(height, width)
+            new_w, new_h = max(1, round(width * scale)), max(1, round(height * scale))
+            sign = cv2.resize(sign, (new_w, new_h), interpolation=cv2.INTER_AREA)
+            x = i * SPRITE_CELL + (SPRITE_CELL - new_w) // 2
+            y = (SPRITE_CELL - new_h) // 2
+            sheet[y:y + new_h, x:x + new_w] = sign
+        ok, encoded = cv2.imencode('.jpg', sheet, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        if not ok:
+            return None
+        data = encoded.tobytes()
+
+        with self._lock:
+            self._sprites[key] = data
+            while len(self._sprites) > self.max_sprites:
+                self._sprites.popitem(last=False)
+        return data, version
+
+    @staticmethod
+    def _accept_map(labels):
+        """Model labels that count as a correct answer for each normalized sign"""
+        accept = {}
+        for label in labels:
+            accept.setdefault(normalize_char_for_image(label), []).append(label)
+        return accept
+
+    def _build(self, text, words):
+        images = {}
+        accept = {}
+        for _, steps in words:
+            for _, target, _, _ in steps:
+                if target not in images:
+                    images[target] = self.sign_store.get(target)
+                    accept[target] = self._accept.get(target, [target])
+
+        # Sprite letters in order of first appearance
+        sprite_letters = [target for target, image in images.items() if image is not None]
+        sprite_index = {target: i for i, target in enumerate(sprite_letters)}
+        sprite = None
+        if sprite_letters:
+            version = self._sprite_version([images[target] for target in sprite_letters])
+            sprite = {
+                'url': f"/sign_sprite?letters={quote(','.join(sprite_letters))}&v={version}",
+                'letters': sprite_letters,
+                'cell': SPRITE_CELL,
+            }
+
+        return {
+            'text': text,
+            'words': [
+                {
+                    'text': word,
+                    'steps': [
+                        {'text': step_text, 'target': target, 'start': start, 'end': end,
+                         'sprite_index': sprite_index.get(target)}
+                        for step_text, target, start, end in steps
+                    ],
+                }
+                for word, steps in words
+            ],
+            'images': {
+                target: f"/sign_image/{quote(target)}?v={image.etag}" if image else None
+                for target, image in images.items()
+            },
+            'accept': accept,
+            'sprite': sprite,
+        }
+
+    @staticmethod
+    def _sprite_version(images):
+        return hashlib.sha1(''.join(image.etag for image in images).encode()).hexdigest()[:16]